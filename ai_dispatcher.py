@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Диспечер на заявките към AI
+Една нишка, ограничена опашка с приоритети и спиране на генерирането
+"""
+
+import heapq
+import itertools
+import threading
+
+from ollama import CancelToken
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 10
+PRIORITY_LOW = 20
+
+
+class AIRequest:
+    """Една заявка към AI, чакаща или изпълнявана от диспечера"""
+    def __init__(self, message, conversation, priority, use_cache, on_start, on_token, on_done):
+        self.message = message
+        self.conversation = conversation
+        self.priority = priority
+        self.use_cache = use_cache
+        self.on_start = on_start
+        self.on_token = on_token
+        self.on_done = on_done
+        self.cancel_token = CancelToken()
+        # 'queued', 'running', 'done' или 'cancelled'
+        self.status = 'queued'
+        self.started = False
+
+    def cancel(self):
+        """Отказва заявката; ако вече тече, прекъсва HTTP потока"""
+        self.cancel_token.cancel()
+
+
+class AIDispatcher:
+    """Изпраща заявките към AI една по една от единствена фонова нишка
+
+    Опашката е с приоритети (по-малко число = по-важна) и побира най-много
+    max_queue заявки - submit() връща None, когато е пълна, вместо да
+    трупа заявки. Заявките от един разговор никога не се изпреварват:
+    новата получава поне приоритета на чакащите от същия разговор.
+
+    on_start(request), on_token(chunk) и on_done(request) се извикват от
+    нишката на диспечера - GUI-то трябва само да се прехвърли (wx.CallAfter).
+    """
+    def __init__(self, client, max_queue=5):
+        self.client = client
+        self.max_queue = max_queue
+        # Опашката е heap под същия lock, с който се сменя текущата заявка -
+        # вземането от опашката и отбелязването като текуща са една стъпка,
+        # така че cancel_all() винаги вижда заявката на едно от двете места
+        self._queue = []
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # Приоритетите на чакащите заявки по разговор
+        self._pending = {}
+        self._current = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="ai-dispatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, message, conversation=None, priority=PRIORITY_NORMAL, use_cache=True,
+               on_start=None, on_token=None, on_done=None):
+        """Слага съобщение на опашката; връща AIRequest или None при пълна опашка"""
+        with self._lock:
+            if self._closed:
+                return None
+            key = id(conversation) if conversation is not None else None
+            pending = self._pending.setdefault(key, [])
+            if key is not None and pending:
+                priority = max([priority] + pending)
+
+            if len(self._queue) >= self.max_queue:
+                if not pending:
+                    self._pending.pop(key, None)
+                return None
+            request = AIRequest(message, conversation, priority, use_cache, on_start, on_token, on_done)
+            heapq.heappush(self._queue, (priority, next(self._order), request))
+            pending.append(priority)
+            self._ready.notify()
+        return request
+
+    def cancel_current(self):
+        """Спира генерирането на текущия отговор (чакащите продължават)"""
+        with self._lock:
+            request = self._current
+        if request is not None:
+            request.cancel()
+        return request is not None
+
+    def cancel_all(self):
+        """Отказва всички чакащи заявки и спира текущата"""
+        with self._lock:
+            drained = [item[2] for item in self._queue if item[2] is not None]
+            self._queue = [item for item in self._queue if item[2] is None]
+            current = self._current
+        for request in drained:
+            request.cancel()
+            self._finish(request, 'cancelled')
+        if current is not None:
+            current.cancel()
+
+    def pending_count(self):
+        """Брой заявки на опашката (без текущата)"""
+        with self._lock:
+            return len(self._queue)
+
+    def is_busy(self):
+        with self._lock:
+            return self._current is not None or bool(self._queue)
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._queue:
+                    self._ready.wait()
+                _, _, request = heapq.heappop(self._queue)
+                if request is None:
+                    break
+                self._current = request
+            if request.cancel_token.cancelled:
+                with self._lock:
+                    self._current = None
+                self._finish(request, 'cancelled')
+                continue
+
+            request.status = 'running'
+            request.started = True
+            try:
+                if request.on_start is not None:
+                    request.on_start(request)
+                for chunk in self.client.chat_stream(request.message, conversation=request.conversation,
+                                                     use_cache=request.use_cache,
+                                                     cancel=request.cancel_token):
+                    if request.on_token is not None:
+                        request.on_token(chunk)
+            except Exception as e:
+                print(f"❌ Грешка в AI диспечера: {e}")
+            finally:
+                with self._lock:
+                    self._current = None
+                self._finish(request, 'cancelled' if request.cancel_token.cancelled else 'done')
+
+    def _finish(self, request, status):
+        request.status = status
+        key = id(request.conversation) if request.conversation is not None else None
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending and request.priority in pending:
+                pending.remove(request.priority)
+            if not pending:
+                self._pending.pop(key, None)
+        if request.on_done is not None:
+            try:
+                request.on_done(request)
+            except Exception as e:
+                print(f"❌ Грешка при обработка на AI отговор: {e}")
+
+    def shutdown(self):
+        """Отказва всичко и спира нишката"""
+        with self._lock:
+            self._closed = True
+        self.cancel_all()
+        with self._ready:
+            heapq.heappush(self._queue, (-1, next(self._order), None))
+            self._ready.notify()
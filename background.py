@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Фонови заявки към базата данни
+Пази GUI нишката свободна, докато SQLite работи
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class DataWorker:
+    """Изпълнява извиквания към Database/Calendar/GradeTracker във фонови нишки
+
+    submit() връща Future. Резултатът се подава на callback през dispatch
+    (в GUI-то това е wx.CallAfter, за да се изпълни в главната нишка).
+    Заявките с еднакъв key се заменят една друга: ако дойде нова, старата
+    се отказва, а резултатът ѝ (ако вече тече) се игнорира.
+    """
+    def __init__(self, dispatch=None, max_workers=2):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._dispatch = dispatch or (lambda func, *args: func(*args))
+        self._lock = threading.Lock()
+        self._generations = {}
+        self._pending = {}
+
+    def submit(self, func, *args, callback=None, error_callback=None, key=None, **kwargs):
+        """Пуска func(*args, **kwargs) във фонова нишка"""
+        generation = None
+        if key is not None:
+            with self._lock:
+                generation = self._generations.get(key, 0) + 1
+                self._generations[key] = generation
+                previous = self._pending.get(key)
+                if previous is not None:
+                    previous.cancel()  # успява само ако още не е започнала
+
+        future = self._executor.submit(func, *args, **kwargs)
+        if key is not None:
+            with self._lock:
+                self._pending[key] = future
+
+        def deliver(handler, value):
+            # Проверяваме отново при доставката - междувременно може да е дошла нова заявка
+            if self.is_current(key, generation):
+                handler(value)
+
+        def on_done(done_future):
+            if done_future.cancelled() or not self.is_current(key, generation):
+                return
+
+            error = done_future.exception()
+            if error is not None:
+                self._dispatch(deliver, error_callback or self._report_error, error)
+            elif callback is not None:
+                self._dispatch(deliver, callback, done_future.result())
+
+        future.add_done_callback(on_done)
+        return future
+
+    def is_current(self, key, generation):
+        """Проверява дали заявката все още е последната със своя ключ"""
+        if key is None:
+            return True
+        with self._lock:
+            return self._generations.get(key) == generation
+
+    def cancel(self, key):
+        """Отказва чакащата заявка с даден ключ и игнорира резултата ѝ"""
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+            previous = self._pending.pop(key, None)
+        if previous is not None:
+            previous.cancel()
+
+    def _report_error(self, error):
+        print(f"❌ Грешка при фонова заявка: {error}")
+
+    def shutdown(self):
+        """Спира нишките; чакащите заявки се отказват"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,8 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмаркове за слоя с данни (Database, Calendar, GradeTracker)
+
+Стартиране от корена на проекта:
+    python -m benchmarks.run --help
+"""
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк на слоя с данни
+
+Създава временна база, пълни я със синтетични данни и измерва реалните
+публични методи на Database, Calendar и GradeTracker. Резултатът се
+записва като JSON отчет.
+
+    python -m benchmarks.run --notes 100000 --subjects 500 --grades 1000000 --events 50000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from database import Database
+from events import Calendar
+from grades import GradeTracker
+from benchmarks.seed import seed_database
+
+
+@contextlib.contextmanager
+def _quiet():
+    """Скрива конзолните съобщения на модулите по време на измерване"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def measure(name, func, repeat, setup=None):
+    """Изпълнява func repeat пъти и връща времената в милисекунди
+
+    setup (ако е дадена) се вика преди всяко повторение, извън измерването.
+    """
+    timings = []
+    result = None
+    for _ in range(repeat):
+        with _quiet():
+            if setup is not None:
+                setup()
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+
+    rows = len(result) if isinstance(result, (list, tuple, dict)) else None
+    return {
+        'name': name,
+        'repeat': repeat,
+        'min_ms': min(timings),
+        'median_ms': statistics.median(timings),
+        'mean_ms': statistics.fmean(timings),
+        'max_ms': max(timings),
+        'rows': rows,
+    }
+
+
+def build_cases(db, calendar, grades):
+    """Връща списък (име, функция[, подготовка]) с измерваните операции"""
+    today = date.today()
+    month_start = today.replace(day=1)
+    subjects = db.get_all_subjects()
+    subject_id = subjects[0][0] if subjects else None
+
+    def add_delete_note():
+        db.delete_note(db.add_note("Бенчмарк", "временна бележка"))
+
+    def add_delete_event():
+        calendar.delete_event(calendar.add_event("Бенчмарк", "", today))
+
+    def add_delete_grade():
+        grades.delete_grade(grades.add_grade(subject_id, 5.0))
+
+    cases = [
+        ('db.get_all_notes', db.get_all_notes),
+        ('db.get_notes_page', db.get_notes_page),
+        ('db.search_notes', lambda: db.search_notes("алгоритъм сложност")),
+        ('db.get_notes_count', db.get_notes_count),
+        ('db.get_all_statistics', db.get_all_statistics),
+        ('calendar.get_all_events', calendar.get_all_events),
+        ('calendar.get_upcoming_events', calendar.get_upcoming_events),
+        ('calendar.get_events_for_date', lambda: calendar.get_events_for_date(today)),
+        ('calendar.get_events_for_month', lambda: calendar.get_events_for_month(today.year, today.month)),
+        # Студено - заявката към базата; топло - попадение в кеша на месеците
+        ('calendar.get_month_index[cold]', lambda: calendar.get_month_index(today.year, today.month),
+         calendar.clear_month_index),
+        ('calendar.get_month_index[warm]', lambda: calendar.get_month_index(today.year, today.month)),
+        ('calendar.get_events_between', lambda: calendar.get_events_between(
+            month_start, month_start + timedelta(days=90), ["exam", "deadline"])),
+        ('grades.get_all_subjects', grades.get_all_subjects),
+        ('grades.get_statistics', grades.get_statistics),
+        ('grades.calculate_average_grade', grades.calculate_average_grade),
+        ('grades.get_grade_summary', grades.get_grade_summary),
+        ('grades.get_grades_with_subjects', grades.get_grades_with_subjects),
+        ('grades.count_grades_with_subjects', grades.count_grades_with_subjects),
+        ('db.add_note+delete_note', add_delete_note),
+        ('calendar.add_event+delete_event', add_delete_event),
+    ]
+
+    if subject_id is not None:
+        cases += [
+            ('grades.get_subject_grades', lambda: grades.get_subject_grades(subject_id)),
+            ('grades.calculate_subject_average', lambda: grades.calculate_subject_average(subject_id)),
+            ('grades.add_grade+delete_grade', add_delete_grade),
+        ]
+    return cases
+
+
+def run(args):
+    """Пълни временна база, пуска измерванията и връща отчета"""
+    workdir = tempfile.mkdtemp(prefix="uniassist-bench-")
+    db_path = os.path.join(workdir, "bench.db")
+
+    # Бавните заявки не се логват - времената им влизат в отчета
+    db = Database(db_path, collect_stats=True, slow_query_ms=None)
+    try:
+        with _quiet():
+            calendar = Calendar(db)
+            grades = GradeTracker(db)
+
+        started = time.perf_counter()
+        with _quiet():
+            counts = seed_database(db, notes=args.notes, subjects=args.subjects, grades=args.grades,
+                                   events=args.events, note_words=args.note_words, seed=args.seed)
+        seed_seconds = time.perf_counter() - started
+        print(f"🌱 Данните са генерирани за {seed_seconds:.1f} сек: {counts}")
+
+        db.reset_query_stats()
+        results = []
+        for name, func, *setup in build_cases(db, calendar, grades):
+            result = measure(name, func, args.repeat, *setup)
+            results.append(result)
+            print(f"⏱️ {name:<36} медиана {result['median_ms']:9.2f} ms")
+
+        return {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'environment': {
+                'python': sys.version.split()[0],
+                'sqlite': sqlite3.sqlite_version,
+                'platform': platform.platform(),
+            },
+            'volumes': counts,
+            'seed_seconds': seed_seconds,
+            'results': results,
+            'query_stats': db.get_query_stats(),
+        }
+    finally:
+        db.close()
+        if not args.keep_db:
+            for suffix in ("", "-wal", "-shm"):
+                with contextlib.suppress(OSError):
+                    os.remove(db_path + suffix)
+            with contextlib.suppress(OSError):
+                os.rmdir(workdir)
+        else:
+            print(f"💾 Базата е запазена в {db_path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк на слоя с данни")
+    parser.add_argument("--notes", type=int, default=100_000)
+    parser.add_argument("--subjects", type=int, default=500)
+    parser.add_argument("--grades", type=int, default=1_000_000)
+    parser.add_argument("--events", type=int, default=50_000)
+    parser.add_argument("--note-words", type=int, default=120, help="думи в съдържанието на бележка")
+    parser.add_argument("--repeat", type=int, default=5, help="повторения на всяко измерване")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="bench_report.json", help="път до JSON отчета")
+    parser.add_argument("--keep-db", action="store_true", help="не изтривай генерираната база")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"📄 Отчетът е записан в {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Генератор на синтетични данни за бенчмарковете
+Пълни базата през add_*_many, без да държи всички редове в паметта
+"""
+
+import random
+from datetime import date, timedelta
+
+WORDS = [
+    "лекция", "изпит", "теорема", "доказателство", "алгоритъм", "функция", "матрица",
+    "интеграл", "производна", "вектор", "граф", "дърво", "сортиране", "сложност",
+    "база", "данни", "заявка", "индекс", "транзакция", "нишка", "процес", "памет",
+    "мрежа", "протокол", "сигнал", "енергия", "сила", "маса", "скорост", "история",
+    "философия", "логика", "статистика", "вероятност", "разпределение", "хипотеза",
+]
+
+EVENT_TYPES = ["general", "exam", "assignment", "lecture", "meeting", "deadline", "birthday", "reminder"]
+EXAM_TYPES = ["test", "exam", "quiz", "homework", "project", "presentation", "lab", "seminar", "coursework"]
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def _random_date(rng, start, span_days):
+    return start + timedelta(days=rng.randrange(span_days))
+
+
+def seed_database(db, notes=0, subjects=0, grades=0, events=0, note_words=120, seed=42):
+    """Пълни базата със синтетични данни и връща броя на добавените редове"""
+    rng = random.Random(seed)
+    # Датите покриват ± година около днес, за да има и минали, и предстоящи
+    start = date.today() - timedelta(days=365)
+    span = 730
+
+    counts = {}
+    counts['notes'] = db.add_notes_many(
+        (f"Бележка {i}: {_text(rng, 4)}", _text(rng, note_words)) for i in range(notes)
+    )['count']
+
+    subject_ids = list(db.add_subjects_many(
+        (f"Предмет {i:04d}", rng.randint(2, 8), f"Преподавател {i % 50}", f"{1 + i % 8}")
+        for i in range(subjects)
+    )['ids'])
+    counts['subjects'] = len(subject_ids)
+
+    if subject_ids:
+        counts['grades'] = db.add_grades_many(
+            (rng.choice(subject_ids), round(rng.uniform(2, 6), 1), rng.choice(EXAM_TYPES),
+             _text(rng, 3), _random_date(rng, start, span))
+            for _ in range(grades)
+        )['count']
+    else:
+        counts['grades'] = 0
+
+    counts['events'] = db.add_events_many(
+        (f"Събитие {i}", _text(rng, 8), _random_date(rng, start, span),
+         f"{rng.randint(8, 20):02d}:{rng.choice(['00', '15', '30', '45'])}", rng.choice(EVENT_TYPES))
+        for i in range(events)
+    )['count']
+
+    return counts
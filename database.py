@@ -5,39 +5,451 @@
 Управлява всички данни: бележки, оценки, събития
 """
 
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime, date
+
+# Всички дати се пазят в ISO-8601, за да се сортират и индексират като текст
+ISO_DATE = "%Y-%m-%d"
+ISO_DATETIME = "%Y-%m-%d %H:%M"
+
+# Известие за промяна: entity е 'note'/'subject'/'grade'/'event',
+# operation е 'insert'/'delete'/'bulk_insert', parent е предметът на оценка
+# или датата на събитие (None, когато няма смисъл)
+ChangeEvent = namedtuple('ChangeEvent', ['entity', 'operation', 'id', 'parent'])
+
+# Израз, който превръща 'DD-MM-YYYY...' или 'DD.MM.YYYY...' в 'YYYY-MM-DD...'
+_DMY_TO_ISO = "substr({col},7,4) || '-' || substr({col},4,2) || '-' || substr({col},1,2) || substr({col},11)"
+_DMY_GLOB = "{col} GLOB '[0-9][0-9][-.][0-9][0-9][-.][0-9][0-9][0-9][0-9]*'"
+
+# Колоните с дати, които миграциите превръщат в ISO
+_DATE_COLUMNS = [
+    ("events", "event_date"),
+    ("events", "created_date"),
+    ("grades", "exam_date"),
+    ("grades", "created_date"),
+    ("notes", "created_date"),
+]
+
+
+def to_iso_date(value):
+    """Превръща дата (DD-MM-YYYY, DD.MM.YYYY, ISO или date) в ISO текст"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime(ISO_DATE)
+    if not value:
+        return value
+    
+    value = value.strip()
+    for fmt in (ISO_DATE, "%d-%m-%Y", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).strftime(ISO_DATE)
+        except ValueError:
+            continue
+    # Непознат формат - пазим го както е въведен
+    return value
+
+
+def format_display_date(value):
+    """Превръща ISO дата/час в DD.MM.YYYY [HH:MM] за показване"""
+    if not value:
+        return ""
+    for fmt, out in ((ISO_DATETIME, "%d.%m.%Y %H:%M"), (ISO_DATE, "%d.%m.%Y")):
+        try:
+            return datetime.strptime(value, fmt).strftime(out)
+        except ValueError:
+            continue
+    return value
+
+
+def _dmy_to_iso_sql(table, col):
+    """UPDATE заявка за миграция на колона от DD-MM-YYYY/DD.MM.YYYY към ISO"""
+    return (f"UPDATE {table} SET {col} = {_DMY_TO_ISO.format(col=col)} "
+            f"WHERE {_DMY_GLOB.format(col=col)}")
+
+
+def _fts5_available(conn):
+    """Проверява дали SQLite е компилиран с FTS5"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp._fts5_probe USING fts5(x)")
+        conn.execute("DROP TABLE temp._fts5_probe")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _create_notes_fts(conn):
+    """Създава FTS5 индекс върху бележките и тригери за синхронизация"""
+    if not _fts5_available(conn):
+        print("⚠️ SQLite няма FTS5 - търсенето в бележки ще използва LIKE")
+        return
+    
+    queries = [
+        '''CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+            title, content,
+            content='notes', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+            INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+        END''',
+        '''CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+            INSERT INTO notes_fts (notes_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content);
+            INSERT INTO notes_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+        END''',
+        # Индексираме вече съществуващите бележки
+        "INSERT INTO notes_fts (notes_fts) VALUES ('rebuild')",
+    ]
+    for query in queries:
+        conn.execute(query)
+
+
+def _fts_match_query(text):
+    """Превръща свободен текст в безопасна FTS5 заявка (всяка дума като префикс)"""
+    terms = text.split()
+    return " ".join('"' + term.replace('"', '""') + '"*' for term in terms)
+
 
 class Database:
-    def __init__(self, db_name="assistant.db"):
+    # Настройки, които се прилагат на всяка нова връзка
+    CONNECTION_PRAGMAS = [
+        "PRAGMA synchronous = NORMAL",
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA cache_size = -8000",
+        "PRAGMA mmap_size = 67108864",
+    ]
+    
+    def __init__(self, db_name="assistant.db", collect_stats=None, slow_query_ms=None):
         self.db_name = db_name
-        self.init_database()
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._closed = False
+        # Коя нишка държи отворена транзакция и колко нива дълбоко
+        self._tx_owner = None
+        self._tx_depth = 0
+        # Абонати за промени; известията в транзакция чакат COMMIT
+        self._listeners = []
+        self._pending_changes = []
+        # Схемата се създава лениво - при първото отваряне на връзка
+        self._schema_ready = False
+        self._schema_building = False
+        self._has_fts = None
+        
+        # Инструментация: по подразбиране е включена, управлява се и от средата
+        if collect_stats is None:
+            collect_stats = os.environ.get("UNIASSIST_QUERY_STATS", "1") != "0"
+        if slow_query_ms is None:
+            try:
+                slow_query_ms = float(os.environ.get("UNIASSIST_SLOW_QUERY_MS", "100"))
+            except ValueError:
+                print("⚠️ Невалидна стойност на UNIASSIST_SLOW_QUERY_MS - използва се 100 ms")
+                slow_query_ms = 100.0
+        self.collect_stats = collect_stats
+        self.slow_query_ms = slow_query_ms
+        self._query_stats = {}
+        self._stats_lock = threading.Lock()
+    
+    # ===================
+    # ВРЪЗКИ КЪМ БАЗАТА
+    # ===================
+    
+    def _connect(self):
+        """Отваря нова връзка с нужните настройки"""
+        conn = sqlite3.connect(self.db_name, timeout=5, check_same_thread=False,
+                               isolation_level=None)
+        for pragma in self.CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        return conn
+    
+    def _get_writer(self):
+        """Връща единствената връзка за запис (създава я при нужда)"""
+        if self._closed:
+            raise sqlite3.ProgrammingError("Базата данни е затворена")
+        if self._writer is None:
+            with self._write_lock:
+                if self._writer is None:
+                    writer = self._connect()
+                    if self.db_name != ":memory:":
+                        writer.execute("PRAGMA journal_mode = WAL")
+                    self._writer = writer
+        if not self._schema_ready:
+            self.init_database()
+        return self._writer
+    
+    def _get_reader(self):
+        """Връща връзка за четене, отделна за всяка нишка"""
+        # In-memory база е видима само от една връзка
+        if self.db_name == ":memory:":
+            return None
+        
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Базата данни е затворена")
+            self._get_writer()  # WAL режимът трябва да е включен преди четците
+            conn = self._connect()
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+    
+    def close(self):
+        """Затваря всички отворени връзки"""
+        with self._write_lock:
+            self._closed = True
+            with self._readers_lock:
+                for conn in self._readers:
+                    conn.close()
+                self._readers = []
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        self._local = threading.local()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
     
     def _execute_query(self, query, params=None, fetch_one=False, fetch_all=False):
         """Помощен метод за изпълнение на заявки"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
+        # Четенията вървят през връзката на текущата нишка, записите - през писателя.
+        # В собствена транзакция четем през писателя, за да виждаме незаписаното.
+        if (fetch_one or fetch_all) and self._tx_owner != threading.get_ident():
+            conn = self._get_reader()
+            if conn is not None:
+                return self._run(conn, query, params, fetch_one, fetch_all)
         
+        with self._write_lock:
+            return self._run(self._get_writer(), query, params, fetch_one, fetch_all)
+    
+    def _run(self, conn, query, params, fetch_one, fetch_all):
+        """Изпълнява една заявка върху дадена връзка"""
+        cursor = conn.cursor()
         try:
-            if params:
-                cursor.execute(query, params)
-            else:
-                cursor.execute(query)
+            started = time.perf_counter() if self.collect_stats else None
+            cursor.execute(query, params or ())
             
             if fetch_one:
                 result = cursor.fetchone()
+                rows = 1 if result is not None else 0
             elif fetch_all:
                 result = cursor.fetchall()
+                rows = len(result)
             else:
                 result = cursor.lastrowid
+                rows = max(cursor.rowcount, 0)
             
-            conn.commit()
+            if started is not None:
+                self._record_query(conn, query, params, started, rows)
             return result
         finally:
-            conn.close()
+            cursor.close()
+    
+    # ===================
+    # ИНСТРУМЕНТАЦИЯ НА ЗАЯВКИТЕ
+    # ===================
+    
+    def _record_query(self, conn, query, params, started, rows):
+        """Записва времето на заявка и логва бавните заедно с плана им"""
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        key = " ".join(query.split())
+        
+        with self._stats_lock:
+            stats = self._query_stats.get(key)
+            if stats is None:
+                stats = self._query_stats[key] = {'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0}
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['rows'] += rows
+            if elapsed_ms > stats['max_ms']:
+                stats['max_ms'] = elapsed_ms
+        
+        if self.slow_query_ms is not None and elapsed_ms >= self.slow_query_ms:
+            print(f"🐢 Бавна заявка ({elapsed_ms:.1f} ms, {rows} реда): {key}")
+            for line in self._explain(conn, query, params):
+                print(f"   ↳ {line}")
+    
+    def _explain(self, conn, query, params):
+        """Връща EXPLAIN QUERY PLAN за SELECT заявка като редове текст"""
+        if not query.lstrip().upper().startswith(("SELECT", "WITH")):
+            return []
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + query, params or ()).fetchall()
+        except sqlite3.Error:
+            return []
+        return [row[-1] for row in plan]
+    
+    def get_query_stats(self):
+        """Връща моментна снимка на статистиката, подредена по общо време"""
+        with self._stats_lock:
+            snapshot = [dict(stats, sql=sql) for sql, stats in self._query_stats.items()]
+        
+        for stats in snapshot:
+            stats['avg_ms'] = stats['total_ms'] / stats['calls']
+        snapshot.sort(key=lambda stats: stats['total_ms'], reverse=True)
+        return snapshot
+    
+    def reset_query_stats(self):
+        """Изчиства натрупаната статистика"""
+        with self._stats_lock:
+            self._query_stats = {}
+    
+    # ===================
+    # ИЗВЕСТИЯ ЗА ПРОМЕНИ
+    # ===================
+    
+    def subscribe(self, callback):
+        """Абонира callback(change) за промените в данните
+        
+        callback се извиква в нишката, която е направила записа, с
+        ChangeEvent след като промяната е записана. GUI-то трябва само
+        да се прехвърли в главната нишка (wx.CallAfter).
+        """
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+    
+    def unsubscribe(self, callback):
+        """Премахва абонат за промени"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _notify(self, entity, operation, entity_id=None, parent=None):
+        """Известява абонатите за промяна (или я отлага до края на транзакцията)"""
+        change = ChangeEvent(entity, operation, entity_id, parent)
+        if self._tx_owner == threading.get_ident():
+            self._pending_changes.append(change)
+            return
+        self._dispatch_changes([change])
+    
+    def _dispatch_changes(self, changes):
+        for change in changes:
+            for callback in list(self._listeners):
+                try:
+                    callback(change)
+                except Exception as e:
+                    print(f"⚠️ Грешка при известие за промяна: {e}")
+    
+    @contextmanager
+    def transaction(self):
+        """Групира няколко записа в една транзакция (един commit/fsync)
+        
+        Вложените извиквания се присъединяват към външната транзакция.
+        При изключение всички промени се отменят.
+        """
+        changes = []
+        with self._write_lock:
+            conn = self._get_writer()
+            if self._tx_depth:
+                self._tx_depth += 1
+                try:
+                    yield conn
+                finally:
+                    self._tx_depth -= 1
+                return
+            
+            conn.execute("BEGIN IMMEDIATE")
+            self._tx_owner = threading.get_ident()
+            self._tx_depth = 1
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            else:
+                conn.execute("COMMIT")
+                changes = self._pending_changes
+            finally:
+                self._tx_owner = None
+                self._tx_depth = 0
+                self._pending_changes = []
+        
+        # Абонатите се известяват извън заключването, само при успешен COMMIT
+        self._dispatch_changes(changes)
+    
+    @contextmanager
+    def snapshot(self):
+        """Всички четения в блока виждат едно и също състояние на базата
+        
+        Отваря транзакция за четене върху връзката на текущата нишка -
+        записите, направени междувременно от други нишки, не се виждат.
+        """
+        if self._tx_owner == threading.get_ident():
+            # В собствена транзакция за запис състоянието и без това е едно
+            yield
+            return
+        
+        conn = self._get_reader()
+        if conn is None:
+            # In-memory база: всички заявки минават през писателя
+            with self._write_lock:
+                yield
+            return
+        if conn.in_transaction:
+            yield
+            return
+        
+        conn.execute("BEGIN")
+        try:
+            yield
+        finally:
+            conn.execute("COMMIT")
+    
+    def _insert_many(self, table, query, rows):
+        """Вмъква много редове с executemany в една транзакция
+        
+        rows може да е генератор - редовете не се събират в списък.
+        Връща {'count': брой, 'ids': range с новите ID-та}.
+        """
+        sequence_query = 'SELECT seq FROM sqlite_sequence WHERE name = ?'
+        with self.transaction() as conn:
+            before = conn.execute(sequence_query, (table,)).fetchone()
+            first_id = (before[0] if before else 0) + 1
+            started = time.perf_counter() if self.collect_stats else None
+            cursor = conn.executemany(query, rows)
+            count = max(cursor.rowcount, 0)
+            if started is not None:
+                self._record_query(conn, query, None, started, count)
+            after = conn.execute(sequence_query, (table,)).fetchone()
+            
+            # AUTOINCREMENT + изключителен запис => новите ID-та обикновено са
+            # последователни; при пропуснати (OR IGNORE) редове ги прочитаме
+            ids = range(first_id, (after[0] if after else 0) + 1)
+            if len(ids) != count:
+                ids = [row[0] for row in conn.execute(
+                    f'SELECT id FROM {table} WHERE id >= ? ORDER BY id', (first_id,))]
+        
+        return {'count': count, 'ids': ids}
     
     def init_database(self):
-        """Създава всички необходими таблици"""
+        """Създава всички необходими таблици (само веднъж за инстанция)"""
+        with self._write_lock:
+            # Флагът пази от повторно влизане от същата нишка през _get_writer
+            if self._schema_ready or self._schema_building:
+                return
+            self._schema_building = True
+            try:
+                self._create_schema()
+                self._schema_ready = True
+            finally:
+                self._schema_building = False
+        
+        print("✅ Централна база данни инициализирана")
+    
+    def _create_schema(self):
+        """CREATE TABLE заявките на схемата"""
         queries = [
             '''CREATE TABLE IF NOT EXISTS notes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -81,7 +493,66 @@ class Database:
         for query in queries:
             self._execute_query(query)
         
-        print("✅ Централна база данни инициализирана")
+        self._migrate()
+    
+    # Миграции по версии (PRAGMA user_version); всяка се прилага веднъж
+    MIGRATIONS = [
+        # 1: ISO-8601 дати и индекси за подредба/диапазони
+        [_dmy_to_iso_sql(table, col) for table, col in _DATE_COLUMNS] + [
+            "CREATE INDEX IF NOT EXISTS idx_events_date_time ON events (event_date, event_time)",
+            "CREATE INDEX IF NOT EXISTS idx_grades_subject_date ON grades (subject_id, exam_date)",
+            "CREATE INDEX IF NOT EXISTS idx_notes_created ON notes (created_date)",
+        ],
+        # 2: филтриране на събития по тип
+        [
+            "CREATE INDEX IF NOT EXISTS idx_events_type_date ON events (event_type, event_date, event_time)",
+        ],
+        # 3: пълнотекстово търсене в бележките
+        [
+            _create_notes_fts,
+        ],
+        # 4: общият списък с оценки е подреден по дата
+        [
+            "CREATE INDEX IF NOT EXISTS idx_grades_date ON grades (exam_date, id)",
+        ],
+        # 5: кеш на отговорите от AI
+        [
+            '''CREATE TABLE IF NOT EXISTS ai_cache (
+                key TEXT PRIMARY KEY,
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_date TEXT NOT NULL,
+                last_used TEXT NOT NULL,
+                hits INTEGER DEFAULT 0
+            )''',
+            "CREATE INDEX IF NOT EXISTS idx_ai_cache_last_used ON ai_cache (last_used)",
+            "CREATE INDEX IF NOT EXISTS idx_ai_cache_created ON ai_cache (created_date)",
+        ],
+        # 6: датите с точки (DD.MM.YYYY), пропуснати от миграция 1
+        [_dmy_to_iso_sql(table, col) for table, col in _DATE_COLUMNS],
+        # 7: агрегатите по предмет се смятат само от индекса
+        [
+            "CREATE INDEX IF NOT EXISTS idx_grades_subject_grade ON grades (subject_id, grade)",
+        ],
+    ]
+    
+    def _migrate(self):
+        """Прилага липсващите миграции в една транзакция"""
+        version = self._execute_query("PRAGMA user_version", fetch_one=True)[0]
+        if version >= len(self.MIGRATIONS):
+            return
+        
+        with self.transaction() as conn:
+            for step in self.MIGRATIONS[version:]:
+                for query in step:
+                    if callable(query):
+                        query(conn)
+                    else:
+                        conn.execute(query)
+            conn.execute(f"PRAGMA user_version = {len(self.MIGRATIONS)}")
+        
+        print(f"🔧 Базата данни мигрирана до версия {len(self.MIGRATIONS)}")
     
     # ===================
     # МЕТОДИ ЗА БЕЛЕЖКИ
@@ -89,27 +560,115 @@ class Database:
     
     def add_note(self, title, content):
         """Добавя нова бележка"""
-        current_time = datetime.now().strftime("%d-%m-%Y %H:%M")
+        current_time = datetime.now().strftime(ISO_DATETIME)
         query = 'INSERT INTO notes (title, content, created_date) VALUES (?, ?, ?)'
         note_id = self._execute_query(query, (title, content, current_time))
+        self._notify('note', 'insert', note_id)
         print(f"✅ Бележка '{title}' добавена с ID: {note_id}")
         return note_id
     
+    def add_notes_many(self, notes):
+        """Добавя много бележки наведнъж; notes е итерируемо от (title, content)"""
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        query = 'INSERT INTO notes (title, content, created_date) VALUES (?, ?, ?)'
+        rows = ((title, content, current_time) for title, content in notes)
+        result = self._insert_many('notes', query, rows)
+        if result['count']:
+            self._notify('note', 'bulk_insert')
+        print(f"✅ Добавени {result['count']} бележки")
+        return result
+    
     def get_all_notes(self):
         """Връща всички бележки"""
         return self._execute_query('SELECT * FROM notes ORDER BY created_date DESC', fetch_all=True)
     
+    def get_notes_page(self, after_id=None, limit=100, offset=0):
+        """Връща страница бележки без съдържанието им: (id, title, created_date)
+        
+        Страниците са по ID в низходящ ред (най-новите първи); за следващата
+        страница се подава ID-то на последния ред като after_id. offset е
+        резервен вариант за произволен скок, когато after_id не е известно.
+        """
+        if after_id is None:
+            query = 'SELECT id, title, created_date FROM notes ORDER BY id DESC LIMIT ? OFFSET ?'
+            return self._execute_query(query, (limit, offset), fetch_all=True)
+        
+        query = 'SELECT id, title, created_date FROM notes WHERE id < ? ORDER BY id DESC LIMIT ?'
+        return self._execute_query(query, (after_id, limit), fetch_all=True)
+    
     def get_note_by_id(self, note_id):
         """Връща бележка по ID"""
         return self._execute_query('SELECT * FROM notes WHERE id = ?', (note_id,), fetch_one=True)
     
     def delete_note(self, note_id):
         """Изтрива бележка"""
-        query = 'DELETE FROM notes WHERE id = ?'
-        self._execute_query(query, (note_id,))
+        with self.transaction():
+            # Известяваме само ако бележката я е имало - броячите разчитат на това
+            row = self._execute_query('SELECT 1 FROM notes WHERE id = ?', (note_id,), fetch_one=True)
+            self._execute_query('DELETE FROM notes WHERE id = ?', (note_id,))
+            if row is not None:
+                self._notify('note', 'delete', note_id)
         print(f"✅ Бележка с ID {note_id} изтрита")
         return True
     
+    def has_notes_search_index(self):
+        """Проверява дали FTS5 индексът за бележки съществува"""
+        if self._has_fts is None:
+            row = self._execute_query(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'notes_fts'",
+                fetch_one=True)
+            self._has_fts = row is not None
+        return self._has_fts
+    
+    def search_notes(self, query, limit=50, offset=0):
+        """Търси в заглавието и съдържанието на бележките
+        
+        Връща редове (id, title, created_date, snippet), подредени по
+        релевантност (BM25, заглавието тежи повече от съдържанието).
+        Вътрешната заявка подрежда само rowid-тата, така че snippet() и
+        съединението с notes се правят само за редовете от страницата.
+        """
+        match = _fts_match_query(query)
+        if not match:
+            return []
+        
+        if self.has_notes_search_index():
+            sql = '''SELECT n.id, n.title, n.created_date,
+                            snippet(notes_fts, -1, '«', '»', '…', 12)
+                     FROM (SELECT rowid, bm25(notes_fts, 10.0, 1.0) AS score
+                           FROM notes_fts
+                           WHERE notes_fts MATCH ?
+                           ORDER BY score
+                           LIMIT ? OFFSET ?) page
+                     JOIN notes_fts ON notes_fts.rowid = page.rowid
+                     JOIN notes n ON n.id = page.rowid
+                     WHERE notes_fts MATCH ?
+                     ORDER BY page.score'''
+            return self._execute_query(sql, (match, limit, offset, match), fetch_all=True)
+        
+        # Резервен вариант без FTS5
+        pattern = f"%{query.strip()}%"
+        sql = '''SELECT id, title, created_date, substr(content, 1, 80)
+                 FROM notes
+                 WHERE title LIKE ? OR content LIKE ?
+                 ORDER BY created_date DESC
+                 LIMIT ? OFFSET ?'''
+        return self._execute_query(sql, (pattern, pattern, limit, offset), fetch_all=True)
+    
+    def count_search_notes(self, query):
+        """Връща броя на бележките, които съвпадат с търсенето"""
+        match = _fts_match_query(query)
+        if not match:
+            return 0
+        
+        if self.has_notes_search_index():
+            sql = 'SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH ?'
+            return self._execute_query(sql, (match,), fetch_one=True)[0]
+        
+        pattern = f"%{query.strip()}%"
+        sql = 'SELECT COUNT(*) FROM notes WHERE title LIKE ? OR content LIKE ?'
+        return self._execute_query(sql, (pattern, pattern), fetch_one=True)[0]
+    
     def get_notes_count(self):
         """Връща броя на бележките"""
         return self._execute_query('SELECT COUNT(*) FROM notes', fetch_one=True)[0]
@@ -120,52 +679,198 @@ class Database:
     
     def add_subject(self, name, credits=3, professor="", semester=""):
         """Добавя нов предмет"""
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M")
+        current_time = datetime.now().strftime(ISO_DATETIME)
         query = 'INSERT INTO subjects (name, credits, professor, semester, created_date) VALUES (?, ?, ?, ?, ?)'
         
         try:
             subject_id = self._execute_query(query, (name, credits, professor, semester, current_time))
-            print(f"✅ Предмет '{name}' добавен")
-            return subject_id
         except sqlite3.IntegrityError:
             print(f"❌ Предмет '{name}' вече съществува")
             return None
+        
+        self._notify('subject', 'insert', subject_id)
+        print(f"✅ Предмет '{name}' добавен")
+        return subject_id
+    
+    def add_subjects_many(self, subjects):
+        """Добавя много предмети наведнъж; subjects е итерируемо от
+        (name[, credits, professor, semester]). Съществуващите се пропускат."""
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        query = '''INSERT OR IGNORE INTO subjects (name, credits, professor, semester, created_date)
+                   VALUES (?, ?, ?, ?, ?)'''
+        rows = (self._subject_params(*subject) + (current_time,) for subject in subjects)
+        result = self._insert_many('subjects', query, rows)
+        if result['count']:
+            self._notify('subject', 'bulk_insert')
+        print(f"✅ Добавени {result['count']} предмета")
+        return result
+    
+    @staticmethod
+    def _subject_params(name, credits=3, professor="", semester=""):
+        return (name, credits, professor, semester)
+    
+    GRADE_INSERT = '''INSERT INTO grades (subject_id, grade, max_grade, exam_type, description, exam_date, created_date)
+                      VALUES (?, ?, ?, ?, ?, ?, ?)'''
+    
+    @staticmethod
+    def _grade_params(subject_id, grade, exam_type="test", description="", exam_date=""):
+        """Параметрите на една оценка без created_date (винаги в скала до 6.0)"""
+        exam_date = to_iso_date(exam_date) or datetime.now().strftime(ISO_DATE)
+        max_grade = 6.0
+        return (subject_id, grade, max_grade, exam_type, description, exam_date)
     
     def add_grade(self, subject_id, grade, exam_type="test", description="", exam_date=""):
         """Добавя нова оценка"""
-        current_time = datetime.now().strftime("%d-%m-%Y %H:%M")
-        if not exam_date:
-            exam_date = datetime.now().strftime("%d-%m-%Y")
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        params = self._grade_params(subject_id, grade, exam_type, description, exam_date)
         
-        max_grade = 6.0
-        query = '''INSERT INTO grades (subject_id, grade, max_grade, exam_type, description, exam_date, created_date)
-                   VALUES (?, ?, ?, ?, ?, ?, ?)'''
-        
-        grade_id = self._execute_query(query, (subject_id, grade, max_grade, exam_type, description, exam_date, current_time))
+        grade_id = self._execute_query(self.GRADE_INSERT, params + (current_time,))
+        self._notify('grade', 'insert', grade_id, subject_id)
         print(f"✅ Оценка {grade}/6.0 добавена")
         return grade_id
     
+    def add_grades_many(self, grades):
+        """Добавя много оценки наведнъж; grades е итерируемо от
+        (subject_id, grade[, exam_type, description, exam_date])"""
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        rows = (self._grade_params(*grade) + (current_time,) for grade in grades)
+        result = self._insert_many('grades', self.GRADE_INSERT, rows)
+        if result['count']:
+            self._notify('grade', 'bulk_insert')
+        print(f"✅ Добавени {result['count']} оценки")
+        return result
+    
     def get_all_subjects(self):
         """Връща всички предмети"""
         return self._execute_query('SELECT * FROM subjects ORDER BY name', fetch_all=True)
     
+    def get_subjects_count(self):
+        """Връща броя на предметите"""
+        return self._execute_query('SELECT COUNT(*) FROM subjects', fetch_one=True)[0]
+    
     def get_subject_grades(self, subject_id):
         """Връща всички оценки за предмет"""
         query = 'SELECT * FROM grades WHERE subject_id = ? ORDER BY exam_date DESC'
         return self._execute_query(query, (subject_id,), fetch_all=True)
     
+    def get_grades_count(self):
+        """Връща броя на оценките"""
+        return self._get_grades_count()
+    
+    @staticmethod
+    def _grade_filters(subject_id=None, exam_type=None, date_from=None, date_to=None, semester=None):
+        """Връща WHERE частта и параметрите за филтрите на оценките"""
+        conditions = []
+        params = []
+        if subject_id is not None:
+            conditions.append('g.subject_id = ?')
+            params.append(subject_id)
+        if exam_type:
+            conditions.append('g.exam_type = ?')
+            params.append(exam_type)
+        if date_from:
+            conditions.append('g.exam_date >= ?')
+            params.append(to_iso_date(date_from))
+        if date_to:
+            conditions.append('g.exam_date <= ?')
+            params.append(to_iso_date(date_to))
+        if semester:
+            conditions.append('s.semester = ?')
+            params.append(semester)
+        
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        return where, params
+    
+    def get_grades_with_subjects(self, subject_id=None, exam_type=None, date_from=None, date_to=None,
+                                 semester=None, limit=100, offset=0, after=None):
+        """Връща страница оценки заедно с името и кредитите на предмета
+        
+        Всеки ред е (id, subject_id, subject_name, credits, grade, max_grade,
+        exam_type, description, exam_date), най-новите първи. Всички филтри
+        са по избор. after е (exam_date, id) на последния ред от предишната
+        страница - тогава следващата се чете по индекса и offset се пренебрегва.
+        """
+        where, params = self._grade_filters(subject_id, exam_type, date_from, date_to, semester)
+        if after is None:
+            return self._select_grades(where, params, limit, offset)
+        
+        after_date, after_id = after
+        if after_date is None:
+            # Оценките без дата са накрая, подредени само по id
+            return self._select_grades(where, params, limit, condition='g.exam_date IS NULL AND g.id < ?',
+                                       condition_params=[after_id])
+        
+        rows = self._select_grades(where, params, limit, condition='(g.exam_date, g.id) < (?, ?)',
+                                   condition_params=[after_date, after_id])
+        if len(rows) < limit:
+            rows += self._select_grades(where, params, limit - len(rows), condition='g.exam_date IS NULL')
+        return rows
+    
+    def _select_grades(self, where, params, limit, offset=0, condition=None, condition_params=()):
+        """Изпълнява заявката на get_grades_with_subjects с допълнително условие"""
+        if condition:
+            where = f"{where} AND {condition}" if where else f" WHERE {condition}"
+            params = params + list(condition_params)
+        query = f'''SELECT g.id, g.subject_id, s.name, s.credits, g.grade, g.max_grade,
+                           g.exam_type, g.description, g.exam_date
+                    FROM grades g
+                    JOIN subjects s ON s.id = g.subject_id{where}
+                    ORDER BY g.exam_date DESC, g.id DESC
+                    LIMIT ? OFFSET ?'''
+        return self._execute_query(query, params + [limit, offset], fetch_all=True)
+    
+    def count_grades_with_subjects(self, subject_id=None, exam_type=None, date_from=None, date_to=None,
+                                   semester=None):
+        """Връща броя на оценките за същите филтри като get_grades_with_subjects"""
+        where, params = self._grade_filters(subject_id, exam_type, date_from, date_to, semester)
+        query = f'SELECT COUNT(*) FROM grades g JOIN subjects s ON s.id = g.subject_id{where}'
+        return self._execute_query(query, params, fetch_one=True)[0]
+    
+    def get_subject_average(self, subject_id):
+        """Връща средната оценка за предмет (None ако няма оценки)"""
+        query = 'SELECT AVG(grade) FROM grades WHERE subject_id = ?'
+        return self._execute_query(query, (subject_id,), fetch_one=True)[0]
+    
+    SUBJECT_SUMMARY = '''SELECT s.id, s.name, s.credits, s.professor, s.semester,
+                                COUNT(g.id), TOTAL(g.grade), AVG(g.grade), MIN(g.grade), MAX(g.grade)
+                         FROM subjects s
+                         LEFT JOIN grades g ON g.subject_id = s.id'''
+    
+    def get_grade_summary(self):
+        """Връща всички предмети с агрегати за оценките им в една заявка
+        
+        Всеки ред е (id, name, credits, professor, semester,
+        grades_count, grades_sum, average, min_grade, max_grade).
+        """
+        query = self.SUBJECT_SUMMARY + ' GROUP BY s.id ORDER BY s.name'
+        return self._execute_query(query, fetch_all=True)
+    
+    def get_subject_summary(self, subject_id):
+        """Връща реда от get_grade_summary() само за един предмет (None ако го няма)"""
+        query = self.SUBJECT_SUMMARY + ' WHERE s.id = ? GROUP BY s.id'
+        return self._execute_query(query, (subject_id,), fetch_one=True)
+    
     def delete_subject(self, subject_id):
         """Изтрива предмет и всичките му оценки"""
-        # Първо изтриваме оценките
-        self._execute_query('DELETE FROM grades WHERE subject_id = ?', (subject_id,))
-        # После изтриваме предмета
-        self._execute_query('DELETE FROM subjects WHERE id = ?', (subject_id,))
+        with self.transaction():
+            row = self._execute_query('SELECT 1 FROM subjects WHERE id = ?', (subject_id,), fetch_one=True)
+            # Първо изтриваме оценките
+            self._execute_query('DELETE FROM grades WHERE subject_id = ?', (subject_id,))
+            # После изтриваме предмета
+            self._execute_query('DELETE FROM subjects WHERE id = ?', (subject_id,))
+            if row is not None:
+                self._notify('subject', 'delete', subject_id)
         print(f"✅ Предмет и оценки изтрити")
         return True
     
     def delete_grade(self, grade_id):
         """Изтрива отделна оценка по ID"""
-        self._execute_query('DELETE FROM grades WHERE id = ?', (grade_id,))
+        with self.transaction():
+            # Предметът е нужен на абонатите, за да обновят само неговия среден успех
+            row = self._execute_query('SELECT subject_id FROM grades WHERE id = ?', (grade_id,), fetch_one=True)
+            self._execute_query('DELETE FROM grades WHERE id = ?', (grade_id,))
+            if row is not None:
+                self._notify('grade', 'delete', grade_id, row[0])
         print(f"✅ Оценка с ID {grade_id} изтрита")
         return True
     
@@ -175,30 +880,81 @@ class Database:
     
     def add_event(self, title, description, event_date, event_time=None, event_type="general"):
         """Добавя ново събитие"""
-        current_time = datetime.now().strftime("%d-%m-%Y %H:%M")
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        event_date = to_iso_date(event_date)
         query = '''INSERT INTO events (title, description, event_date, event_time, event_type, created_date)
                    VALUES (?, ?, ?, ?, ?, ?)'''
         
         event_id = self._execute_query(query, (title, description, event_date, event_time, event_type, current_time))
+        self._notify('event', 'insert', event_id, event_date)
         print(f"✅ Събитие '{title}' добавено")
         return event_id
     
+    def add_events_many(self, events):
+        """Добавя много събития наведнъж; events е итерируемо от
+        (title, description, event_date[, event_time, event_type])"""
+        current_time = datetime.now().strftime(ISO_DATETIME)
+        query = '''INSERT INTO events (title, description, event_date, event_time, event_type, created_date)
+                   VALUES (?, ?, ?, ?, ?, ?)'''
+        rows = (self._event_params(*event) + (current_time,) for event in events)
+        result = self._insert_many('events', query, rows)
+        if result['count']:
+            self._notify('event', 'bulk_insert')
+        print(f"✅ Добавени {result['count']} събития")
+        return result
+    
+    @staticmethod
+    def _event_params(title, description, event_date, event_time=None, event_type="general"):
+        return (title, description, to_iso_date(event_date), event_time, event_type)
+    
     def get_all_events(self):
-        """Връща всички събития, сортирани по дата"""
-        query = '''SELECT * FROM events 
-                   ORDER BY 
-                   CASE 
-                       WHEN substr(event_date,7,4) || '-' || substr(event_date,4,2) || '-' || substr(event_date,1,2) >= date('now') 
-                       THEN substr(event_date,7,4) || '-' || substr(event_date,4,2) || '-' || substr(event_date,1,2)
-                       ELSE '9999-12-31'
-                   END,
-                   event_time'''
+        """Връща всички събития: първо предстоящите по дата, после миналите"""
+        # Две индексни заявки вместо сортиране по изчислен израз
+        today = datetime.now().strftime(ISO_DATE)
+        upcoming = self._execute_query(
+            'SELECT * FROM events WHERE event_date >= ? ORDER BY event_date, event_time',
+            (today,), fetch_all=True)
+        past = self._execute_query(
+            'SELECT * FROM events WHERE event_date < ? ORDER BY event_date, event_time',
+            (today,), fetch_all=True)
+        return upcoming + past
+    
+    def get_events_between(self, start_date, end_date, types=None):
+        """Връща събитията между две дати (включително), по избор само от дадени типове"""
+        params = [to_iso_date(start_date), to_iso_date(end_date)]
+        query = 'SELECT * FROM events WHERE event_date BETWEEN ? AND ?'
         
-        return self._execute_query(query, fetch_all=True)
+        if types:
+            types = list(types)
+            query += f' AND event_type IN ({", ".join("?" * len(types))})'
+            params.extend(types)
+        
+        query += ' ORDER BY event_date, event_time'
+        return self._execute_query(query, params, fetch_all=True)
+    
+    def get_events_for_date(self, event_date):
+        """Връща събитията за един ден, подредени по час"""
+        query = 'SELECT * FROM events WHERE event_date = ? ORDER BY event_time'
+        return self._execute_query(query, (to_iso_date(event_date),), fetch_all=True)
+    
+    def get_events_for_month(self, year, month):
+        """Връща събитията за даден месец"""
+        # ISO датите на месеца са в диапазона [YYYY-MM-01, YYYY-MM-31]
+        prefix = f"{year:04d}-{month:02d}"
+        return self.get_events_between(f"{prefix}-01", f"{prefix}-31")
+    
+    def get_events_by_type(self, event_type):
+        """Връща събитията от даден тип"""
+        query = 'SELECT * FROM events WHERE event_type = ? ORDER BY event_date, event_time'
+        return self._execute_query(query, (event_type,), fetch_all=True)
     
     def delete_event(self, event_id):
         """Изтрива събитие"""
-        self._execute_query('DELETE FROM events WHERE id = ?', (event_id,))
+        with self.transaction():
+            row = self._execute_query('SELECT event_date FROM events WHERE id = ?', (event_id,), fetch_one=True)
+            self._execute_query('DELETE FROM events WHERE id = ?', (event_id,))
+            if row is not None:
+                self._notify('event', 'delete', event_id, row[0])
         print(f"✅ Събитие изтрито")
         return True
     
@@ -206,6 +962,43 @@ class Database:
         """Връща броя на събитията"""
         return self._execute_query('SELECT COUNT(*) FROM events', fetch_one=True)[0]
     
+    # ===================
+    # КЕШ НА AI ОТГОВОРИТЕ
+    # ===================
+    
+    AI_CACHE_TIME = "%Y-%m-%d %H:%M:%S"
+    
+    def get_ai_response(self, key, created_after):
+        """Връща (отговор, кога е записан) за кеширан отговор след created_after (или None)"""
+        query = 'SELECT response, created_date FROM ai_cache WHERE key = ? AND created_date >= ?'
+        row = self._execute_query(query, (key, created_after.strftime(self.AI_CACHE_TIME)), fetch_one=True)
+        if row is None:
+            return None
+        
+        now = datetime.now().strftime(self.AI_CACHE_TIME)
+        self._execute_query('UPDATE ai_cache SET last_used = ?, hits = hits + 1 WHERE key = ?', (now, key))
+        return row[0], datetime.strptime(row[1], self.AI_CACHE_TIME)
+    
+    def put_ai_response(self, key, provider, model, response):
+        """Записва (или презаписва) отговор в кеша"""
+        now = datetime.now().strftime(self.AI_CACHE_TIME)
+        query = '''INSERT OR REPLACE INTO ai_cache (key, provider, model, response, created_date, last_used)
+                   VALUES (?, ?, ?, ?, ?, ?)'''
+        self._execute_query(query, (key, provider, model, response, now, now))
+    
+    def evict_ai_responses(self, created_before, max_rows):
+        """Изтрива остарелите отговори и най-отдавна ползваните над max_rows"""
+        with self.transaction():
+            self._execute_query('DELETE FROM ai_cache WHERE created_date < ?',
+                                (created_before.strftime(self.AI_CACHE_TIME),))
+            self._execute_query('''DELETE FROM ai_cache WHERE key IN (
+                                       SELECT key FROM ai_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)''',
+                                (max_rows,))
+    
+    def clear_ai_responses(self):
+        """Изчиства кеша на AI отговорите"""
+        self._execute_query('DELETE FROM ai_cache')
+    
     # ===================
     # ОБЩИ СТАТИСТИКИ
     # ===================
@@ -215,7 +1008,7 @@ class Database:
         return {
             'notes_count': self.get_notes_count(),
             'events_count': self.get_events_count(),
-            'subjects_count': len(self.get_all_subjects()),
+            'subjects_count': self.get_subjects_count(),
             'grades_count': self._get_grades_count()
         }
     
@@ -5,12 +5,31 @@
 Използва централната база данни
 """
 
+import threading
+from collections import OrderedDict
 from datetime import datetime, timedelta
-from database import Database
+from database import Database, ISO_DATE
+
+
+def shift_month(year, month, delta):
+    """Връща (година, месец), отместени с delta месеца"""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
 
 class Calendar:
-    def __init__(self):
-        self.db = Database()
+    # Колко месеца да пази индексът по месеци
+    MONTH_CACHE_SIZE = 24
+    
+    def __init__(self, db=None):
+        # Базата се подава отвън, за да се споделя между всички модули
+        self.db = db if db is not None else Database()
+        
+        # Индекс {(година, месец): {ден: [събития]}}; изчиства се при промени
+        self._months = OrderedDict()
+        self._months_version = 0
+        self._months_lock = threading.Lock()
+        self.db.subscribe(self._on_data_changed)
         print("📅 Календар инициализиран")
     
     # Директно използваме database методите
@@ -30,37 +49,89 @@ class Calendar:
         """Връща предстоящи събития за следващите X дни"""
         today = datetime.now().date()
         future_date = today + timedelta(days=days)
+        return self.db.get_events_between(today, future_date)
+    
+    def get_events_between(self, start_date, end_date, types=None):
+        """Връща събитията в диапазон от дати"""
+        return self.db.get_events_between(start_date, end_date, types)
+    
+    def get_today_events(self):
+        """Връща днешните събития"""
+        today = datetime.now().strftime(ISO_DATE)
+        return self.get_events_for_date(today)
+    
+    def get_events_for_date(self, date_str):
+        """Връща всички събития за определена дата, подредени по час"""
+        return self.db.get_events_for_date(date_str)
+    
+    def get_events_for_month(self, year, month):
+        """Връща всички събития за даден месец"""
+        return self.db.get_events_for_month(year, month)
+    
+    def get_month_index(self, year, month):
+        """Връща {ден: [събития за деня]} за месеца
         
-        all_events = self.get_all_events()
-        upcoming_events = []
+        Зарежда се с една заявка по диапазон от дати и се пази в паметта,
+        докато не се промени събитие в същия месец.
+        """
+        key = (year, month)
+        with self._months_lock:
+            index = self._months.get(key)
+            if index is not None:
+                self._months.move_to_end(key)
+                return index
+            version = self._months_version
         
-        for event in all_events:
+        index = {}
+        for event in self.db.get_events_for_month(year, month):
             try:
-                event_date = datetime.strptime(event[3], "%d-%m-%Y").date()
-                if today <= event_date <= future_date:
-                    upcoming_events.append(event)
+                day = int(event[3][8:10])
             except ValueError:
                 continue
+            index.setdefault(day, []).append(event)
         
-        return upcoming_events
+        with self._months_lock:
+            # Ако междувременно е имало промяна, не кешираме остарелия резултат
+            if self._months_version == version:
+                self._months[key] = index
+                while len(self._months) > self.MONTH_CACHE_SIZE:
+                    self._months.popitem(last=False)
+        return index
     
-    def get_today_events(self):
-        """Връща днешните събития"""
-        today = datetime.now().strftime("%d-%m-%Y")
-        return self.get_events_for_date(today)
+    def peek_month_index(self, year, month):
+        """Връща индекса на месеца само ако вече е зареден (иначе None)"""
+        with self._months_lock:
+            return self._months.get((year, month))
     
-    def get_events_for_date(self, date_str):
-        """Връща всички събития за определена дата"""
-        all_events = self.get_all_events()
-        events_for_date = [event for event in all_events if event[3] == date_str]
-        # Сортираме по време
-        events_for_date.sort(key=lambda x: x[4] if x[4] else "")
-        return events_for_date
+    def clear_month_index(self):
+        """Изчиства кеша на месечните индекси"""
+        with self._months_lock:
+            self._months_version += 1
+            self._months.clear()
+    
+    def prefetch_adjacent_months(self, year, month):
+        """Зарежда предишния и следващия месец, за да е мигновено прелистването"""
+        for delta in (-1, 1):
+            self.get_month_index(*shift_month(year, month, delta))
+    
+    def _on_data_changed(self, change):
+        """Абонат на Database - изчиства месеца на променено събитие"""
+        if change.entity != 'event':
+            return
+        
+        with self._months_lock:
+            self._months_version += 1
+            try:
+                key = (int(change.parent[:4]), int(change.parent[5:7]))
+            except (TypeError, ValueError):
+                # Масово вмъкване или дата в непознат формат
+                self._months.clear()
+                return
+            self._months.pop(key, None)
     
     def get_events_by_type(self, event_type):
         """Връща събития по тип"""
-        all_events = self.get_all_events()
-        return [event for event in all_events if event[5] == event_type]
+        return self.db.get_events_by_type(event_type)
     
     def get_event_types(self):
         """Връща всички типове събития"""
@@ -72,7 +143,7 @@ class Calendar:
         
         # Форматираме датата
         try:
-            date_obj = datetime.strptime(event_date, "%d-%m-%Y")
+            date_obj = datetime.strptime(event_date, ISO_DATE)
             formatted_date = date_obj.strftime("%d.%m.%Y")
         except:
             formatted_date = event_date
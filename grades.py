@@ -6,11 +6,12 @@
 """
 
 from datetime import datetime
-from database import Database
+from database import Database, ISO_DATE
 
 class GradeTracker:
-    def __init__(self):
-        self.db = Database()
+    def __init__(self, db=None):
+        # Базата се подава отвън, за да се споделя между всички модули
+        self.db = db if db is not None else Database()
         print("📊 Система за оценки инициализирана")
     
     # Директно използваме database методите
@@ -27,6 +28,16 @@ class GradeTracker:
     def get_subject_grades(self, subject_id):
         return self.db.get_subject_grades(subject_id)
     
+    def get_grades_with_subjects(self, subject_id=None, exam_type=None, date_from=None, date_to=None,
+                                 semester=None, limit=100, offset=0, after=None):
+        """Връща оценки с името на предмета - една заявка, с филтри по избор"""
+        return self.db.get_grades_with_subjects(subject_id, exam_type, date_from, date_to,
+                                                semester, limit, offset, after)
+    
+    def count_grades_with_subjects(self, subject_id=None, exam_type=None, date_from=None, date_to=None,
+                                   semester=None):
+        return self.db.count_grades_with_subjects(subject_id, exam_type, date_from, date_to, semester)
+    
     def delete_subject(self, subject_id):
         return self.db.delete_subject(subject_id)
     
@@ -36,43 +47,66 @@ class GradeTracker:
     
     def calculate_subject_average(self, subject_id):
         """Изчислява средната оценка за предмет"""
-        grades = self.get_subject_grades(subject_id)
-        
-        if not grades:
-            return 0.0
-        
         # Просто средно аритметично - всички оценки са в скала 2-6
-        total_grades = sum(grade[2] for grade in grades)
-        return round(total_grades / len(grades), 2)
+        average = self.db.get_subject_average(subject_id)
+        return round(average, 2) if average is not None else 0.0
     
     def calculate_average_grade(self):
         """Изчислява общата средна оценка (аритметично средно)"""
-        subjects = self.get_all_subjects()
-        
-        if not subjects:
-            return 0.0
-        
-        subject_averages = [self.calculate_subject_average(subject[0]) for subject in subjects]
-        valid_averages = [avg for avg in subject_averages if avg > 0]
-        
-        return round(sum(valid_averages) / len(valid_averages), 2) if valid_averages else 0.0
+        return self.get_grade_summary()['average_grade']
     
-
+    def get_grade_summary(self):
+        """Връща агрегатите по предмети и общите стойности с една заявка"""
+        return self.summarize([self._subject_dict(row) for row in self.db.get_grade_summary()])
+    
+    def get_subject_summary(self, subject_id):
+        """Връща агрегатите само за един предмет (None ако го няма)"""
+        row = self.db.get_subject_summary(subject_id)
+        return self._subject_dict(row) if row is not None else None
+    
+    @staticmethod
+    def _subject_dict(row):
+        subject_id, name, credits, professor, semester, count, total, average, min_grade, max_grade = row
+        return {
+            'id': subject_id,
+            'name': name,
+            'credits': credits,
+            'professor': professor,
+            'semester': semester,
+            'grades_count': count,
+            'grades_sum': total,
+            'average': round(average, 2) if average is not None else 0.0,
+            'min_grade': min_grade,
+            'max_grade': max_grade
+        }
+    
+    @staticmethod
+    def summarize(subjects):
+        """Изчислява общите стойности от вече заредени агрегати по предмети"""
+        # Общата средна е средно на средните по предмети (както досега)
+        valid_averages = [s['average'] for s in subjects if s['average'] > 0]
+        
+        return {
+            'subjects': subjects,
+            'total_subjects': len(subjects),
+            'total_grades': sum(s['grades_count'] for s in subjects),
+            'average_grade': round(sum(valid_averages) / len(valid_averages), 2) if valid_averages else 0.0,
+            'subjects_with_grades': len([s for s in subjects if s['grades_count'] > 0])
+        }
     
     def get_exam_types(self):
         """Връща всички типове изпити"""
         return ["test", "exam", "quiz", "homework", "project", "presentation", "lab", "seminar", "coursework"]
     
-    def get_statistics(self):
-        """Връща статистики за оценките"""
-        subjects = self.get_all_subjects()
-        total_grades = sum(len(self.get_subject_grades(s[0])) for s in subjects)
+    def get_statistics(self, subjects=None):
+        """Връща статистики за оценките (от вече заредени агрегати, ако са дадени)"""
+        summary = self.summarize(subjects) if subjects is not None else self.get_grade_summary()
         
         return {
-            'total_subjects': len(subjects),
-            'total_grades': total_grades,
-            'average_grade': self.calculate_average_grade(),
-            'subjects_with_grades': len([s for s in subjects if len(self.get_subject_grades(s[0])) > 0])
+            'total_subjects': summary['total_subjects'],
+            'total_grades': summary['total_grades'],
+            'average_grade': summary['average_grade'],
+            'subjects_with_grades': summary['subjects_with_grades']
         }
     
     def format_grade_text(self, grade, subject_name=None):
@@ -81,7 +115,7 @@ class GradeTracker:
         
         # Форматираме датата
         try:
-            date_obj = datetime.strptime(exam_date, "%d-%m-%Y")
+            date_obj = datetime.strptime(exam_date, ISO_DATE)
             formatted_date = date_obj.strftime("%d.%m.%Y")
         except:
             formatted_date = exam_date
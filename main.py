@@ -21,23 +21,29 @@
 7. POMODORO TAB + методи
 8. CALENDAR TAB + методи
 9. GRADES TAB + методи
-10. Dialog класове
-11. Главно приложение
+10. Виртуални списъци
+11. Dialog класове
+12. Главно приложение
 """
 
+import time
+PROCESS_STARTED = time.perf_counter()  # за отчета за стартиране
+
+import os
+import sys
 import wx
-import wx.adv
 import threading
+from collections import OrderedDict
 from datetime import datetime
 import random
-import time
 
-# Импортираме нашите модули
-from database import Database
-from ollama import OllamaClient
+# Импортираме нашите модули. ollama (и requests), events, grades и wx.adv
+# се импортират при първото използване, за да не забавят стартирането.
+from database import Database, format_display_date
+from background import DataWorker
 from pomodoro import PomodoroTimer
-from events import Calendar
-from grades import GradeTracker
+
+IMPORTS_DONE = time.perf_counter()
 
 class StudentAssistant(wx.Frame):
     # ============================================================================
@@ -46,13 +52,23 @@ class StudentAssistant(wx.Frame):
     
     def __init__(self):
         super().__init__(None, title="🎓 Студентски Асистент", size=(800, 600))
+        self.startup_timings = {'imports_ms': (IMPORTS_DONE - PROCESS_STARTED) * 1000, 'tabs': {}}
         
-        # Инициализираме компонентите
+        # Инициализираме компонентите; AI клиентът, календарът и оценките
+        # се създават при първото използване (виж свойствата по-долу)
         self.db = Database()
-        self.ai = OllamaClient()
         self.pomodoro = PomodoroTimer()
-        self.calendar = Calendar()
-        self.grades = GradeTracker()
+        self._ai = None
+        self._calendar = None
+        self._grades = None
+        self._stats = None
+        self.ai_dispatcher = None
+        # Заявките към базата от обработчиците вървят във фонови нишки
+        self.worker = DataWorker(dispatch=wx.CallAfter)
+        # Отделна нишка за мрежовите заявки към AI, за да не чакат базата
+        self.ai_worker = DataWorker(dispatch=wx.CallAfter, max_workers=1)
+        # Промените от един обработчик се събират и се показват наведнъж
+        self.refresher = RefreshScheduler(self, self.worker, self.db)
         
         # Създаваме интерфейса
         self.create_ui()
@@ -61,8 +77,42 @@ class StudentAssistant(wx.Frame):
         # Показваме поздрав
         self.show_greeting()
         
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+        # Списъците се обновяват точково според промените в базата
+        self.db.subscribe(self.on_data_changed)
+        
+        self.startup_timings['frame_ms'] = (time.perf_counter() - PROCESS_STARTED) * 1000
         print("🎓 Студентски асистент стартиран успешно!")
     
+    @property
+    def ai(self):
+        if self._ai is None:
+            from ollama import OllamaClient
+            from response_cache import ResponseCache
+            self._ai = OllamaClient(cache=ResponseCache(self.db))
+        return self._ai
+    
+    @property
+    def calendar(self):
+        if self._calendar is None:
+            from events import Calendar
+            self._calendar = Calendar(self.db)
+        return self._calendar
+    
+    @property
+    def grades(self):
+        if self._grades is None:
+            from grades import GradeTracker
+            self._grades = GradeTracker(self.db)
+        return self._grades
+    
+    @property
+    def stats(self):
+        if self._stats is None:
+            from stats_cache import StatisticsCache
+            self._stats = StatisticsCache(self.db, self.grades)
+        return self._stats
+    
     def create_ui(self):
         """Създава потребителския интерфейс"""
         # Главен панел
@@ -83,13 +133,22 @@ class StudentAssistant(wx.Frame):
         # Notebook за таб страници
         self.notebook = wx.Notebook(panel)
         
-        # Създаваме табовете
-        self.create_home_tab()
-        self.create_chat_tab()
-        self.create_notes_tab()
-        self.create_pomodoro_tab()
-        self.create_calendar_tab()
-        self.create_grades_tab()
+        # Табовете се създават при първото им отваряне - сега само празни страници
+        self.tab_builders = [
+            ("🏠 Начало", self.create_home_tab),
+            ("💬 AI Чат", self.create_chat_tab),
+            ("📝 Бележки", self.create_notes_tab),
+            ("🍅 Pomodoro", self.create_pomodoro_tab),
+            ("📅 Календар", self.create_calendar_tab),
+            ("📊 Оценки", self.create_grades_tab),
+        ]
+        self.built_tabs = set()
+        for label, builder in self.tab_builders:
+            self.notebook.AddPage(wx.Panel(self.notebook), label)
+        self.notebook.Bind(wx.EVT_NOTEBOOK_PAGE_CHANGED, self.on_tab_changed)
+        
+        # Началната страница се вижда веднага
+        self.ensure_tab_built(0)
         
         # Layout
         main_sizer.Add(title, 0, wx.ALL | wx.CENTER, 10)
@@ -98,6 +157,47 @@ class StudentAssistant(wx.Frame):
         main_sizer.Add(self.notebook, 1, wx.EXPAND | wx.ALL, 10)
         
         panel.SetSizer(main_sizer)
+        panel.Bind(wx.EVT_PAINT, self.on_first_paint)
+    
+    def on_tab_changed(self, event):
+        """Създава съдържанието на таба при първото му отваряне"""
+        self.ensure_tab_built(event.GetSelection())
+        event.Skip()
+    
+    def ensure_tab_built(self, index):
+        """Изгражда таба, ако още не е изграден"""
+        if index < 0 or index in self.built_tabs:
+            return
+        self.built_tabs.add(index)
+        
+        label, builder = self.tab_builders[index]
+        page = self.notebook.GetPage(index)
+        
+        started = time.perf_counter()
+        builder(page)
+        page.Layout()
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        
+        self.startup_timings['tabs'][label] = elapsed_ms
+        print(f"⏱️ Таб {label} изграден за {elapsed_ms:.1f} ms")
+    
+    def on_first_paint(self, event):
+        """Записва времето до първото изрисуване на прозореца"""
+        event.Skip()
+        if 'first_paint_ms' in self.startup_timings:
+            return
+        self.startup_timings['first_paint_ms'] = (time.perf_counter() - PROCESS_STARTED) * 1000
+        wx.CallAfter(self.print_startup_report)
+    
+    def print_startup_report(self):
+        """Показва отчета за времето на стартиране"""
+        timings = self.startup_timings
+        print("⏱️ Отчет за стартиране:")
+        print(f"   • Импорти: {timings['imports_ms']:.1f} ms")
+        print(f"   • Прозорец създаден: {timings['frame_ms']:.1f} ms")
+        print(f"   • Първо изрисуване: {timings['first_paint_ms']:.1f} ms")
+        for label, elapsed_ms in timings['tabs'].items():
+            print(f"   • Таб {label}: {elapsed_ms:.1f} ms")
     
     def get_greeting(self):
         """Връща поздрав според часа от деня"""
@@ -113,6 +213,21 @@ class StudentAssistant(wx.Frame):
         
         return f"{greeting} | {current_time}"
     
+    def on_close(self, event):
+        """Затваря връзките към базата при изход"""
+        self.pomodoro.remove_listener(self.on_pomodoro_state_change)
+        self.db.unsubscribe(self.on_data_changed)
+        if self._stats is not None:
+            self._stats.close()
+        self.worker.shutdown()
+        self.ai_worker.shutdown()
+        if self.ai_dispatcher is not None:
+            self.ai_dispatcher.shutdown()
+        if self._ai is not None:
+            self._ai.close()
+        self.db.close()
+        event.Skip()
+    
     def show_greeting(self):
         """Показва поздрав в конзолата"""
         hour = datetime.now().hour
@@ -123,13 +238,29 @@ class StudentAssistant(wx.Frame):
         else:
             print("🌙 Добър вечер! Време е за учене!")
 
+    def on_data_changed(self, change):
+        """Абонат на Database - извиква се от нишката, направила записа"""
+        wx.CallAfter(self.apply_data_change, change)
+
+    def apply_data_change(self, change):
+        """Обновява само засегнатите редове и агрегати (в GUI нишката)"""
+        handlers = {
+            'note': self.on_note_changed,
+            'subject': self.on_subject_changed,
+            'grade': self.on_grade_changed,
+            'event': self.on_event_changed,
+        }
+        # Табовете, които още не са изградени, ще заредят данните си при отваряне;
+        # останалите отбелязват областите си и RefreshScheduler ги обновява наведнъж
+        handlers[change.entity](change)
+        self.refresher.mark_dirty('home_stats')
+
     # ============================================================================
     # 🏠 HOME TAB - Начална страница
     # ============================================================================
     
-    def create_home_tab(self):
+    def create_home_tab(self, home_panel):
         """Създава началната страница"""
-        home_panel = wx.Panel(self.notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
         
         # Дневен цитат
@@ -145,23 +276,10 @@ class StudentAssistant(wx.Frame):
         quote_label = wx.StaticText(home_panel, label=f"Цитат на деня:\n{daily_quote}")
         quote_label.SetForegroundColour(wx.Colour(100, 100, 200))
         
-        # Статистики
-        notes_count = self.db.get_notes_count()
-        pomodoro_stats = self.pomodoro.get_statistics()
-        events_count = self.calendar.get_events_count()
-        grade_stats = self.grades.get_statistics()
-        
-        stats_text = f"""
-📊 Твоите статистики:
-• 📝 Бележки: {notes_count}
-• 🍅 Pomodoro сесии: {pomodoro_stats['sessions_completed']} 
-• ⏰ Работно време: {pomodoro_stats['total_work_minutes']} мин
-• 📅 Събития: {events_count}
-• 📚 Предмети: {grade_stats['total_subjects']}
-• 🎯 Средна оценка: {grade_stats['average_grade']:.2f}
-        """
-        
-        stats_label = wx.StaticText(home_panel, label=stats_text)
+        # Статистики - зареждат се във фона, след като прозорецът се покаже
+        self.home_stats_label = wx.StaticText(home_panel, label="\n📊 Зареждане на статистиките...\n")
+        self.refresher.register('home_stats', lambda details: self.stats.get_dashboard(), self.show_home_stats)
+        self.refresh_home_stats()
         
         # Бързи действия
         actions_box = wx.StaticBox(home_panel, label="Бързи действия")
@@ -179,19 +297,47 @@ class StudentAssistant(wx.Frame):
         # Layout
         sizer.Add(quote_label, 0, wx.ALL | wx.CENTER, 20)
         sizer.Add(wx.StaticLine(home_panel), 0, wx.EXPAND | wx.ALL, 10)
-        sizer.Add(stats_label, 0, wx.ALL, 20)
+        sizer.Add(self.home_stats_label, 0, wx.ALL, 20)
         sizer.Add(actions_sizer, 0, wx.ALL | wx.CENTER, 20)
         
         home_panel.SetSizer(sizer)
-        self.notebook.AddPage(home_panel, "🏠 Начало")
+    
+    # HOME МЕТОДИ
+    # --------------------------------------------------------------------------------
+    
+    def refresh_home_stats(self):
+        """Показва статистиките от кеша; липсващите се зареждат във фона"""
+        stats = self.stats.peek_dashboard()
+        if stats is not None:
+            self.worker.cancel('home_stats')
+            self.show_home_stats(stats)
+            return
+        
+        self.worker.submit(self.stats.get_dashboard, key='home_stats', callback=self.show_home_stats)
+    
+    def show_home_stats(self, stats):
+        """Показва заредените статистики"""
+        pomodoro_stats = self.pomodoro.get_statistics()
+        grade_stats = stats['grade_stats']
+        
+        stats_text = f"""
+📊 Твоите статистики:
+• 📝 Бележки: {stats['notes_count']}
+• 🍅 Pomodoro сесии: {pomodoro_stats['sessions_completed']} 
+• ⏰ Работно време: {pomodoro_stats['total_work_minutes']} мин
+• 📅 Събития: {stats['events_count']}
+• 📚 Предмети: {stats['subjects_count']}
+• 🎯 Средна оценка: {grade_stats['average_grade']:.2f}
+        """
+        self.home_stats_label.SetLabel(stats_text)
+        self.home_stats_label.GetParent().Layout()
     
     # ============================================================================
     # 💬 AI CHAT TAB - Чат с изкуствен интелект  
     # ============================================================================
     
-    def create_chat_tab(self):
+    def create_chat_tab(self, chat_panel):
         """Създава чат страницата"""
-        chat_panel = wx.Panel(self.notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
         
         # AI Доставчик
@@ -243,13 +389,44 @@ class StudentAssistant(wx.Frame):
         self.chat_input.Bind(wx.EVT_TEXT_ENTER, self.send_message)
         send_btn = wx.Button(chat_panel, label="📤 Изпрати")
         send_btn.Bind(wx.EVT_BUTTON, self.send_message)
+        stop_btn = wx.Button(chat_panel, label="⏹️ Спри")
+        stop_btn.Bind(wx.EVT_BUTTON, self.stop_generating)
+        new_chat_btn = wx.Button(chat_panel, label="🧹 Нов разговор")
+        new_chat_btn.Bind(wx.EVT_BUTTON, self.new_conversation)
         
         input_sizer.Add(self.chat_input, 1, wx.ALL | wx.EXPAND, 5)
         input_sizer.Add(send_btn, 0, wx.ALL, 5)
+        input_sizer.Add(stop_btn, 0, wx.ALL, 5)
+        input_sizer.Add(new_chat_btn, 0, wx.ALL, 5)
+        
+        # Повторените въпроси се връщат от кеша, освен ако не е изключен
+        self.use_cache_check = wx.CheckBox(chat_panel, label="💾 Кеширани отговори")
+        self.use_cache_check.SetValue(True)
+        input_sizer.Add(self.use_cache_check, 0, wx.ALL | wx.CENTER, 5)
         
         # Статус
         self.chat_status = wx.StaticText(chat_panel, label="Готов за чат")
         
+        # Отговорът идва на парчета от фонова нишка; таймерът ги добавя
+        # към чата на порции, вместо да прерисува след всяка дума
+        self.chat_buffer = []
+        self.chat_buffer_lock = threading.Lock()
+        # Историята на разговора - въпросите се изпращат с контекста си
+        from ollama import Conversation
+        self.conversation = Conversation(
+            system_prompt="Ти си полезен асистент на студент. Отговаряй на езика на въпроса.",
+            summarizer=self.ai.summarize
+        )
+        self.chat_pending = 0
+        # Новият разговор изчаква отказаните заявки да приключат
+        self.chat_reset_pending = False
+        
+        # Всички въпроси минават през една опашка - по ред и с възможност за спиране
+        from ai_dispatcher import AIDispatcher
+        self.ai_dispatcher = AIDispatcher(self.ai)
+        self.chat_stream_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.flush_chat_buffer, self.chat_stream_timer)
+        
         # Layout
         sizer.Add(provider_sizer, 0, wx.EXPAND | wx.ALL, 5)
         sizer.Add(self.api_key_sizer, 0, wx.EXPAND | wx.ALL, 5)
@@ -259,7 +436,6 @@ class StudentAssistant(wx.Frame):
         sizer.Add(self.chat_status, 0, wx.ALL, 5)
         
         chat_panel.SetSizer(sizer)
-        self.notebook.AddPage(chat_panel, "💬 AI Чат")
         
         # Зареждаме моделите
         self.refresh_models()
@@ -268,9 +444,12 @@ class StudentAssistant(wx.Frame):
     # --------------------------------------------------------------------------------
 
     def refresh_models(self, event=None):
-        """Обновява списъка с AI модели"""
-        models = self.ai.get_available_models()
-        
+        """Обновява списъка с AI модели (мрежовата заявка е във фона)"""
+        self.chat_status.SetLabel("🔄 Търсене на модели...")
+        self.ai_worker.submit(self.ai.get_available_models, key='models', callback=self.show_models)
+
+    def show_models(self, models):
+        """Показва намерените AI модели"""
         self.model_choice.Clear()
         if models:
             for model in models:
@@ -288,6 +467,9 @@ class StudentAssistant(wx.Frame):
         message = self.chat_input.GetValue().strip()
         if not message:
             return
+        if self.chat_reset_pending:
+            self.chat_status.SetLabel("⏳ Предишният разговор се спира - опитайте след миг")
+            return
         
         # Задаваме модела
         if self.model_choice.GetSelection() >= 0:
@@ -295,24 +477,82 @@ class StudentAssistant(wx.Frame):
             if model_name != "Няма модели":
                 self.ai.set_model(model_name)
         
-        # Показваме съобщението
-        self.chat_display.AppendText(f"🧑 Ти: {message}\n\n")
-        self.chat_input.SetValue("")
-        self.chat_status.SetLabel("🤖 AI мисли...")
+        use_cache = self.use_cache_check.GetValue()
+        
+        # Въпросът се показва, когато дойде редът му, за да не се преплита
+        # с отговора, който още се пише
+        def on_start(request):
+            self.on_ai_response(f"🧑 Ти: {message}\n\n🤖 AI: ")
         
-        # Изпращаме в отделен thread
-        def send_thread():
-            response = self.ai.chat(message)
-            wx.CallAfter(self.on_ai_response, response)
+        def on_done(request):
+            if request.started:
+                self.on_ai_response("\n\n")
+            wx.CallAfter(self.on_ai_response_done)
+        
+        request = self.ai_dispatcher.submit(message, conversation=self.conversation, use_cache=use_cache,
+                                            on_start=on_start, on_token=self.on_ai_response, on_done=on_done)
+        if request is None:
+            # Опашката е пълна - въпросът остава в полето за по-късно
+            self.chat_status.SetLabel("⏳ Има твърде много чакащи въпроси - изчакайте отговор")
+            return
         
-        thread = threading.Thread(target=send_thread)
-        thread.daemon = True
-        thread.start()
+        self.chat_input.SetValue("")
+        self.chat_pending += 1
+        self.chat_stream_timer.Start(50)
+        if self.chat_pending == 1:
+            self.chat_status.SetLabel("🤖 AI мисли...")
+        else:
+            self.chat_status.SetLabel(f"⏳ Въпросът е на опашката ({self.chat_pending - 1} преди него)")
+
+    def stop_generating(self, event):
+        """Спира отговора, който се пише в момента"""
+        if self.ai_dispatcher.cancel_current():
+            self.chat_status.SetLabel("⏹️ Спиране...")
+
+    def on_ai_response(self, chunk):
+        """Приема парче от отговора на AI (извиква се от фоновата нишка)"""
+        with self.chat_buffer_lock:
+            self.chat_buffer.append(chunk)
+
+    def flush_chat_buffer(self, event=None):
+        """Добавя натрупаните парчета към чата с едно прерисуване"""
+        with self.chat_buffer_lock:
+            text = "".join(self.chat_buffer)
+            self.chat_buffer = []
+        if text:
+            self.chat_display.AppendText(text)
+            self.chat_status.SetLabel("✍️ AI отговаря...")
+
+    def on_ai_response_done(self):
+        """Показва остатъка от отговора и спира таймера"""
+        self.flush_chat_buffer()
+        self.chat_pending -= 1
+        if not self.chat_pending:
+            self.chat_stream_timer.Stop()
+            if self.chat_reset_pending:
+                self.reset_conversation()
+            else:
+                self.chat_status.SetLabel("✅ Готов за нови въпроси")
+
+    def new_conversation(self, event):
+        """Спира чакащите и текущия отговор и започва нов разговор"""
+        self.ai_dispatcher.cancel_all()
+        if self.chat_pending:
+            # Историята и чатът се изчистват, след като нишката на диспечера
+            # приключи - иначе отказаният отговор би се появил в новия разговор
+            self.chat_reset_pending = True
+            self.chat_status.SetLabel("⏹️ Спиране...")
+            return
+        self.reset_conversation()
 
-    def on_ai_response(self, response):
-        """Обработва отговора от AI"""
-        self.chat_display.AppendText(f"🤖 AI: {response}\n\n")
-        self.chat_status.SetLabel("✅ Готов за нови въпроси")
+    def reset_conversation(self):
+        """Забравя историята и изчиства чата"""
+        self.chat_reset_pending = False
+        with self.chat_buffer_lock:
+            self.chat_buffer = []
+        self.conversation.reset()
+        self.chat_display.Clear()
+        self.chat_status.SetLabel("🧹 Започнат е нов разговор")
 
     def on_provider_change(self, event):
         """Променя AI доставчика"""
@@ -351,9 +591,8 @@ class StudentAssistant(wx.Frame):
     # 📝 NOTES TAB - Бележки
     # ============================================================================
 
-    def create_notes_tab(self):
+    def create_notes_tab(self, notes_panel):
         """Създава страницата с бележки"""
-        notes_panel = wx.Panel(self.notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
         
         # Бутони
@@ -370,11 +609,23 @@ class StudentAssistant(wx.Frame):
         btn_sizer.Add(refresh_btn, 0, wx.ALL, 5)
         btn_sizer.Add(delete_btn, 0, wx.ALL, 5)
         
-        # Списък с бележки
-        self.notes_list = wx.ListCtrl(notes_panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
-        self.notes_list.AppendColumn("ID", width=50)
-        self.notes_list.AppendColumn("Заглавие", width=200)
-        self.notes_list.AppendColumn("Създадена", width=150)
+        # Търсене в бележките
+        self.notes_search = wx.SearchCtrl(notes_panel, style=wx.TE_PROCESS_ENTER)
+        self.notes_search.SetDescriptiveText("Търси в бележките...")
+        self.notes_search.ShowCancelButton(True)
+        self.notes_search.Bind(wx.EVT_TEXT, self.on_notes_search_text)
+        self.notes_search.Bind(wx.EVT_TEXT_ENTER, self.refresh_notes)
+        self.notes_search.Bind(wx.EVT_SEARCHCTRL_CANCEL_BTN, self.on_notes_search_cancel)
+        self._notes_search_timer = None
+        btn_sizer.Add(self.notes_search, 1, wx.ALL | wx.EXPAND, 5)
+        
+        # Списък с бележки - виртуален, редовете се зареждат на страници
+        self.notes_list = VirtualListCtrl(
+            notes_panel,
+            [("ID", 50), ("Заглавие", 200), ("Създадена", 150), ("Откъс", 300)],
+            lambda note: (str(note[0]), note[1], format_display_date(note[2]), note[3] or ""),
+            worker=self.worker, key='notes_pages'
+        )
         
         # Преглед на бележка
         self.note_view = wx.TextCtrl(notes_panel, style=wx.TE_MULTILINE | wx.TE_READONLY)
@@ -382,13 +633,12 @@ class StudentAssistant(wx.Frame):
         self.notes_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_note_selected)
         
         # Layout
-        sizer.Add(btn_sizer, 0, wx.ALL, 5)
+        sizer.Add(btn_sizer, 0, wx.EXPAND | wx.ALL, 5)
         sizer.Add(self.notes_list, 1, wx.EXPAND | wx.ALL, 5)
         sizer.Add(wx.StaticText(notes_panel, label="Съдържание:"), 0, wx.ALL, 5)
         sizer.Add(self.note_view, 1, wx.EXPAND | wx.ALL, 5)
         
         notes_panel.SetSizer(sizer)
-        self.notebook.AddPage(notes_panel, "📝 Бележки")
         
         # Зареждаме бележките
         self.refresh_notes()
@@ -397,14 +647,41 @@ class StudentAssistant(wx.Frame):
     # --------------------------------------------------------------------------------
 
     def refresh_notes(self, event=None):
-        """Обновява списъка с бележки"""
-        self.notes_list.DeleteAllItems()
-        notes = self.db.get_all_notes()
+        """Обновява списъка с бележки (или резултатите от търсенето)"""
+        search_text = self.notes_search.GetValue().strip()
         
-        for note in notes:
-            index = self.notes_list.InsertItem(self.notes_list.GetItemCount(), str(note[0]))
-            self.notes_list.SetItem(index, 1, note[1])
-            self.notes_list.SetItem(index, 2, note[3])
+        if search_text:
+            # (id, title, created_date, snippet), подредени по релевантност
+            count_func = lambda: self.db.count_search_notes(search_text)
+            
+            def fetch(offset, limit, previous_row):
+                return self.db.search_notes(search_text, limit=limit, offset=offset)
+        else:
+            count_func = self.db.get_notes_count
+            
+            def fetch(offset, limit, previous_row):
+                # Само колоните за списъка; съдържанието се зарежда при избор.
+                # Ако предишната страница е в кеша, продължаваме по ключ.
+                if previous_row is not None:
+                    page = self.db.get_notes_page(after_id=previous_row[0], limit=limit)
+                else:
+                    page = self.db.get_notes_page(limit=limit, offset=offset)
+                return [(note_id, title, created_date, "") for note_id, title, created_date in page]
+        
+        # Броят се смята във фона; новото търсене отменя предишното
+        self.worker.submit(count_func, key='notes_list',
+                           callback=lambda count: self.notes_list.set_source(count, fetch))
+
+    def on_notes_search_text(self, event):
+        """Търси с малко закъснение, докато потребителят пише"""
+        if self._notes_search_timer is not None and self._notes_search_timer.IsRunning():
+            self._notes_search_timer.Stop()
+        self._notes_search_timer = wx.CallLater(250, self.refresh_notes)
+
+    def on_notes_search_cancel(self, event):
+        """Изчиства търсенето и показва всички бележки"""
+        self.notes_search.SetValue("")
+        self.refresh_notes()
 
     def add_note(self, event):
         """Добавя нова бележка"""
@@ -412,8 +689,8 @@ class StudentAssistant(wx.Frame):
         if dialog.ShowModal() == wx.ID_OK:
             title, content = dialog.get_data()
             if title and content:
-                self.db.add_note(title, content)
-                self.refresh_notes()
+                # Списъкът се обновява от известието за промяна
+                self.worker.submit(self.db.add_note, title, content)
         dialog.Destroy()
 
     def delete_note(self, event):
@@ -423,30 +700,65 @@ class StudentAssistant(wx.Frame):
             wx.MessageBox("Моля изберете бележка за изтриване", "Информация")
             return
         
-        note_id = int(self.notes_list.GetItemText(selected, 0))
+        row = self.notes_list.get_row(selected)
+        if row is None:
+            return  # страницата още се зарежда
+        note_id = row[0]
         
         if wx.MessageBox("Сигурни ли сте?", "Потвърждение", wx.YES_NO) == wx.YES:
-            self.db.delete_note(note_id)
-            self.refresh_notes()
+            self.worker.cancel('note_view')
             self.note_view.SetValue("")
+            self.worker.submit(self.db.delete_note, note_id)
+
+    def on_note_changed(self, change):
+        """Отразява добавена/изтрита бележка без пълно презареждане"""
+        if not hasattr(self, 'notes_list'):
+            return
+        if change.operation == 'bulk_insert' or self.notes_search.GetValue().strip():
+            # Резултатите от търсене са по релевантност - мястото на реда не е известно
+            self.refresh_notes()
+            return
+        
+        # Списъкът е по ID в низходящ ред: нова бележка е най-отгоре, а
+        # изтриването мести нагоре само редовете след нея
+        selected = self.notes_list.GetFirstSelected()
+        select = None
+        row = self.notes_list.get_row(selected) if selected != -1 else None
+        if row is not None:
+            selected_id = row[0]
+            if change.operation == 'insert':
+                select = selected + 1
+            elif change.id > selected_id:
+                select = selected - 1
+            elif change.id < selected_id:
+                select = selected
+        
+        delta = 1 if change.operation == 'insert' else -1
+        self.notes_list.reload(self.notes_list.GetItemCount() + delta, select=select)
 
     def on_note_selected(self, event):
         """Показва съдържанието на избраната бележка"""
-        selected = event.GetIndex()
-        note_id = int(self.notes_list.GetItemText(selected, 0))
+        row = self.notes_list.get_row(event.GetIndex())
+        if row is None:
+            return  # страницата още се зарежда
+        note_id = row[0]
         
-        note = self.db.get_note_by_id(note_id)
+        # При бързо прелистване показваме само последно избраната бележка
+        self.worker.submit(self.db.get_note_by_id, note_id, key='note_view',
+                           callback=self.show_note)
+
+    def show_note(self, note):
+        """Показва заредената бележка в полето за преглед"""
         if note:
-            content = f"Заглавие: {note[1]}\nСъздадена: {note[3]}\n\n{note[2]}"
+            content = f"Заглавие: {note[1]}\nСъздадена: {format_display_date(note[3])}\n\n{note[2]}"
             self.note_view.SetValue(content)
 
     # ============================================================================
     # 🍅 POMODORO TAB - Pomodoro техника
     # ============================================================================
 
-    def create_pomodoro_tab(self):
+    def create_pomodoro_tab(self, pomodoro_panel):
         """Създава Pomodoro страницата"""
-        pomodoro_panel = wx.Panel(self.notebook)
         sizer = wx.BoxSizer(wx.VERTICAL)
         
         # Статус
@@ -473,16 +785,8 @@ class StudentAssistant(wx.Frame):
         btn_sizer.Add(self.stop_btn, 0, wx.ALL, 5)
         
         # Статистики
-        stats = self.pomodoro.get_statistics()
-        stats_text = f"""
-🍅 Pomodoro статистики:
-• Завършени сесии: {stats['sessions_completed']}
-• Общо работно време: {stats['total_work_minutes']} минути
-• Работна сесия: {stats['work_session_length']} минути
-• Почивка: {stats['break_length']} минути
-        """
-        
-        self.pomodoro_stats = wx.StaticText(pomodoro_panel, label=stats_text)
+        self.pomodoro_stats = wx.StaticText(pomodoro_panel)
+        self.update_pomodoro_stats()
         
         # Layout
         sizer.Add(self.pomodoro_status, 0, wx.ALL | wx.CENTER, 20)
@@ -491,94 +795,107 @@ class StudentAssistant(wx.Frame):
         sizer.Add(self.pomodoro_stats, 0, wx.ALL, 20)
         
         pomodoro_panel.SetSizer(sizer)
-        self.notebook.AddPage(pomodoro_panel, "🍅 Pomodoro")
         
-        # Стартираме обновяването на статуса
-        self.start_pomodoro_updates()
+        # Дисплеят се опреснява от wx.Timer само докато тече сесия;
+        # промените в състоянието идват като събития от таймера
+        self.pomodoro_ui_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_pomodoro_timer, self.pomodoro_ui_timer)
+        self.pomodoro.add_listener(self.on_pomodoro_state_change)
+        self.set_pomodoro_buttons(running=self.pomodoro.is_running)
+        self.update_pomodoro_display(self.pomodoro.get_status())
+        if self.pomodoro.is_running and not self.pomodoro.is_paused:
+            self.pomodoro_ui_timer.Start(1000)
 
     # POMODORO МЕТОДИ
     # --------------------------------------------------------------------------------
 
     def start_work(self, event):
         """Започва работна сесия"""
-        if self.pomodoro.start_work_session():
-            self.work_btn.Enable(False)
-            self.break_btn.Enable(False)
-            self.pause_btn.Enable(True)
-            self.stop_btn.Enable(True)
+        self.pomodoro.start_work_session()
 
     def start_break(self, event):
         """Започва почивка"""
-        if self.pomodoro.start_break_session():
-            self.work_btn.Enable(False)
-            self.break_btn.Enable(False)
-            self.pause_btn.Enable(True)
-            self.stop_btn.Enable(True)
+        self.pomodoro.start_break_session()
 
     def pause_pomodoro(self, event):
         """Превключва пауза/продължи"""
         self.pomodoro.pause_timer()
-        # Текстът на бутона се обновява автоматично от update_pomodoro_display
+        # Дисплеят се обновява от събитието 'paused'/'resumed'
 
     def stop_pomodoro(self, event):
         """Спира таймера"""
         self.pomodoro.stop_timer()
-        self.work_btn.Enable(True)
-        self.break_btn.Enable(True)
-        self.pause_btn.Enable(False)
-        self.stop_btn.Enable(False)
-        self.pomodoro_status.SetLabel("Спрян")
         print("\a")  # Звуков сигнал при спиране
 
-    def start_pomodoro_updates(self):
-        """Стартира обновяването на Pomodoro статуса"""
-        def update_status():
-            while True:
-                status = self.pomodoro.get_status()
-                wx.CallAfter(self.update_pomodoro_display, status)
-                time.sleep(1)
-        
-        thread = threading.Thread(target=update_status)
-        thread.daemon = True
-        thread.start()
+    def on_pomodoro_state_change(self, event_name, status):
+        """Абонат на PomodoroTimer - може да се извика от нишката на таймера"""
+        # Всяка секунда идва 'tick', но дисплеят има собствен wx.Timer -
+        # към GUI нишката пращаме само смените на състоянието
+        if event_name != 'tick':
+            wx.CallAfter(self.on_pomodoro_event, event_name, status)
+
+    def on_pomodoro_event(self, event_name, status):
+        """Обработва смяна на състоянието на таймера (в GUI нишката)"""
+        if event_name in ('started', 'resumed'):
+            self.set_pomodoro_buttons(running=True)
+            self.pomodoro_ui_timer.Start(1000)
+        else:
+            self.pomodoro_ui_timer.Stop()
+        
+        self.update_pomodoro_display(self.pomodoro.get_status())
+        
+        if event_name in ('completed', 'stopped'):
+            self.set_pomodoro_buttons(running=False)
+            if event_name == 'stopped':
+                self.pomodoro_status.SetLabel("Спрян")
+            else:
+                # Статистиките се променят само при завършена сесия
+                self.update_pomodoro_stats()
+                if hasattr(self, 'home_stats_label'):
+                    self.refresh_home_stats()
+
+    def on_pomodoro_timer(self, event):
+        """Опреснява оставащото време (само докато тече сесия)"""
+        self.update_pomodoro_display(self.pomodoro.get_status())
+
+    def set_pomodoro_buttons(self, running):
+        """Разрешава бутоните според това дали тече сесия"""
+        self.work_btn.Enable(not running)
+        self.break_btn.Enable(not running)
+        self.pause_btn.Enable(running)
+        self.stop_btn.Enable(running)
 
     def update_pomodoro_display(self, status):
         """Обновява дисплея на Pomodoro"""
-        if hasattr(self, 'pomodoro_status'):
-            self.pomodoro_status.SetLabel(status['message'])
-            
-            # Обновяваме текста на pause бутона
-            if hasattr(self, 'pause_btn') and status['status'] == 'running':
-                if status.get('is_paused', False):
-                    self.pause_btn.SetLabel("▶️ Продължи")
-                else:
-                    self.pause_btn.SetLabel("⏸️ Пауза")
-            
-            # Обновяваме статистиките
-            if status['status'] == 'stopped':
-                stats = self.pomodoro.get_statistics()
-                stats_text = f"""
+        self.pomodoro_status.SetLabel(status['message'])
+        
+        # Обновяваме текста на pause бутона
+        if status['status'] == 'running':
+            if status.get('is_paused', False):
+                self.pause_btn.SetLabel("▶️ Продължи")
+            else:
+                self.pause_btn.SetLabel("⏸️ Пауза")
+
+    def update_pomodoro_stats(self):
+        """Обновява статистиките на Pomodoro"""
+        stats = self.pomodoro.get_statistics()
+        stats_text = f"""
 🍅 Pomodoro статистики:
 • Завършени сесии: {stats['sessions_completed']}
 • Общо работно време: {stats['total_work_minutes']} минути
 • Работна сесия: {stats['work_session_length']} минути
 • Почивка: {stats['break_length']} минути
-                """
-                self.pomodoro_stats.SetLabel(stats_text)
-                
-                # Възстановяваме бутоните
-                self.work_btn.Enable(True)
-                self.break_btn.Enable(True)
-                self.pause_btn.Enable(False)
-                self.stop_btn.Enable(False)
+        """
+        self.pomodoro_stats.SetLabel(stats_text)
 
     # ============================================================================
     # 📅 CALENDAR TAB - Календар със събития
     # ============================================================================
 
-    def create_calendar_tab(self):
+    def create_calendar_tab(self, calendar_panel):
         """Създава календарната страница с реален календар"""
-        calendar_panel = wx.Panel(self.notebook)
+        import wx.adv
+        
         sizer = wx.BoxSizer(wx.VERTICAL)
         
         # Бутони
@@ -600,18 +917,18 @@ class StudentAssistant(wx.Frame):
                                                 style=wx.adv.CAL_SHOW_HOLIDAYS | 
                                                       wx.adv.CAL_MONDAY_FIRST)
         self.calendar_ctrl.Bind(wx.adv.EVT_CALENDAR_SEL_CHANGED, self.on_date_selected)
+        self.calendar_ctrl.Bind(wx.adv.EVT_CALENDAR_PAGE_CHANGED, self.on_date_selected)
         
         # Събития за избраната дата
         events_box = wx.StaticBox(calendar_panel, label="Събития за избраната дата")
         events_sizer = wx.StaticBoxSizer(events_box, wx.VERTICAL)
         
-        self.selected_date_events = wx.ListCtrl(calendar_panel, 
-                                              style=wx.LC_REPORT | wx.LC_SINGLE_SEL,
-                                              size=(-1, 150))
-        self.selected_date_events.AppendColumn("ID", width=50)
-        self.selected_date_events.AppendColumn("Събитие", width=200)
-        self.selected_date_events.AppendColumn("Час", width=80)
-        self.selected_date_events.AppendColumn("Тип", width=100)
+        self.selected_date_events = VirtualListCtrl(
+            calendar_panel,
+            [("ID", 50), ("Събитие", 200), ("Час", 80), ("Тип", 100)],
+            lambda event: (str(event[0]), event[1], event[4] or "", event[5]),
+            size=(-1, 150)
+        )
         
         events_sizer.Add(self.selected_date_events, 1, wx.EXPAND | wx.ALL, 5)
         
@@ -628,7 +945,8 @@ class StudentAssistant(wx.Frame):
         sizer.Add(events_sizer, 1, wx.EXPAND | wx.ALL, 5)
         
         calendar_panel.SetSizer(sizer)
-        self.notebook.AddPage(calendar_panel, "📅 Календар")
+        
+        self.refresher.register('calendar_month', self.load_month_indexes, self.show_month_indexes)
         
         # Инициализираме с днешната дата
         self.refresh_calendar_display()
@@ -637,39 +955,54 @@ class StudentAssistant(wx.Frame):
     # --------------------------------------------------------------------------------
 
     def refresh_calendar_display(self):
-        """Обновява календарния дисплей"""
-        # Обновяваме событията за текущо избраната дата
+        """Отбелязва дните със събития и показва събитията за избраната дата"""
         selected_date = self.calendar_ctrl.GetDate()
-        date_str = selected_date.Format("%d-%m-%Y")
-        self.update_date_events(date_str)
+        year, month = selected_date.GetYear(), selected_date.GetMonth() + 1
+        
+        # Заредените месеци се показват веднага, без заявка
+        index = self.calendar.peek_month_index(year, month)
+        if index is not None:
+            self.show_month_index(year, month, index)
+        else:
+            self.worker.submit(self.calendar.get_month_index, year, month, key='month_index',
+                               callback=lambda index: self.show_month_index(year, month, index))
+        
+        # Съседните месеци се зареждат предварително във фона
+        self.worker.submit(self.calendar.prefetch_adjacent_months, year, month, key='month_prefetch')
+
+    def show_month_index(self, year, month, index):
+        """Маркира дните със събития в показания месец"""
+        selected_date = self.calendar_ctrl.GetDate()
+        if (selected_date.GetYear(), selected_date.GetMonth() + 1) != (year, month):
+            return  # междувременно е избран друг месец
+        
+        for day in range(1, 32):
+            # Родните контроли (wxMSW, wxGTK) пренебрегват атрибутите и
+            # поддържат само Mark() - затова маркираме и с двете
+            self.calendar_ctrl.Mark(day, day in index)
+            if day in index:
+                # Контролът поема собствеността на атрибута - нов за всеки ден
+                attr = wx.adv.CalendarDateAttr(wx.Colour(200, 50, 50))
+                attr.SetBorder(wx.adv.CAL_BORDER_ROUND)
+                attr.SetBorderColour(wx.Colour(200, 50, 50))
+                self.calendar_ctrl.SetAttr(day, attr)
+            else:
+                self.calendar_ctrl.ResetAttr(day)
+        self.calendar_ctrl.Refresh()
+        
+        self.selected_date_events.set_rows(index.get(selected_date.GetDay(), []))
 
     def on_date_selected(self, event):
         """Обработва избиране на дата в календара"""
         selected_date = self.calendar_ctrl.GetDate()
-        date_str = selected_date.Format("%d-%m-%Y")
         
         # Обновяваме информацията за датата
         formatted_date = selected_date.Format("%d.%m.%Y")
         weekday = selected_date.GetWeekDayName(selected_date.GetWeekDay())
         self.date_info.SetLabel(f"📅 {weekday}, {formatted_date}")
         
-        # Показваме събитията за тази дата
-        self.update_date_events(date_str)
-
-    def update_date_events(self, date_str):
-        """Обновява списъка със събития за дадена дата"""
-        self.selected_date_events.DeleteAllItems()
-        
-        # Вземаме всички събития и филтрираме по дата
-        all_events = self.calendar.get_all_events()
-        date_events = [event for event in all_events if event[3] == date_str]
-        
-        for event_data in date_events:
-            index = self.selected_date_events.InsertItem(self.selected_date_events.GetItemCount(), str(event_data[0]))
-            self.selected_date_events.SetItem(index, 1, event_data[1])  # title
-            self.selected_date_events.SetItem(index, 2, event_data[4] or "")  # time
-            self.selected_date_events.SetItem(index, 3, event_data[5])  # type
-
+        # Събитията за деня идват от индекса на месеца
+        self.refresh_calendar_display()
 
     def go_to_today(self, event):
         """Отива на днешната дата в календара"""
@@ -686,8 +1019,7 @@ class StudentAssistant(wx.Frame):
         dialog = EventDialog(self, "Ново събитие", default_date)
         if dialog.ShowModal() == wx.ID_OK:
             title, description, date, time, event_type = dialog.get_data()
-            self.calendar.add_event(title, description, date, time, event_type)
-            self.refresh_calendar_display()
+            self.worker.submit(self.calendar.add_event, title, description, date, time, event_type)
         dialog.Destroy()
 
     def delete_event(self, event):
@@ -697,21 +1029,35 @@ class StudentAssistant(wx.Frame):
             wx.MessageBox("Моля изберете събитие за изтриване от списъка", "Информация")
             return
         
-        event_id = int(self.selected_date_events.GetItemText(selected, 0))
-        event_title = self.selected_date_events.GetItemText(selected, 1)
+        event_id, event_title = self.selected_date_events.get_row(selected)[:2]
         
         if wx.MessageBox(f"Сигурни ли сте, че искате да изтриете '{event_title}'?", 
                         "Потвърждение", wx.YES_NO | wx.ICON_QUESTION) == wx.YES:
-            self.calendar.delete_event(event_id)
-            self.refresh_calendar_display()
+            self.worker.submit(self.calendar.delete_event, event_id)
+
+    def on_event_changed(self, change):
+        """Презарежда индекса само ако промяната е в показания месец"""
+        if not hasattr(self, 'calendar_ctrl'):
+            return
+        selected_date = self.calendar_ctrl.GetDate()
+        year, month = selected_date.GetYear(), selected_date.GetMonth() + 1
+        if change.operation == 'bulk_insert' or (change.parent or "").startswith(f"{year:04d}-{month:02d}"):
+            self.refresher.mark_dirty('calendar_month', (year, month))
+
+    def load_month_indexes(self, months):
+        """Зарежда индексите на отбелязаните месеци (във фонова нишка)"""
+        return {key: self.calendar.get_month_index(*key) for key in months}
+
+    def show_month_indexes(self, indexes):
+        for (year, month), index in indexes.items():
+            self.show_month_index(year, month, index)
 
     # ============================================================================
     # 📚 GRADES TAB - Система за оценки
     # ============================================================================
 
-    def create_grades_tab(self):
+    def create_grades_tab(self, grades_panel):
         """Създава страницата за оценки"""
-        grades_panel = wx.Panel(self.notebook)
         main_sizer = wx.BoxSizer(wx.VERTICAL)
         
         # Разделяме на горна и долна част
@@ -733,12 +1079,12 @@ class StudentAssistant(wx.Frame):
         subjects_btn_sizer.Add(delete_subject_btn, 0, wx.ALL, 5)
         
         # Списък с предмети
-        self.subjects_list = wx.ListCtrl(subjects_panel, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
-        self.subjects_list.AppendColumn("ID", width=50)
-        self.subjects_list.AppendColumn("Предмет", width=200)
-        self.subjects_list.AppendColumn("Кредити", width=80)
-        self.subjects_list.AppendColumn("Преподавател", width=150)
-        self.subjects_list.AppendColumn("Средна оценка", width=100)
+        self.subjects_list = VirtualListCtrl(
+            subjects_panel,
+            [("ID", 50), ("Предмет", 200), ("Кредити", 80), ("Преподавател", 150), ("Средна оценка", 100)],
+            lambda subject: (str(subject['id']), subject['name'], str(subject['credits']),
+                             subject['professor'] or "", f"{subject['average']:.2f}")
+        )
         
         self.subjects_list.Bind(wx.EVT_LIST_ITEM_SELECTED, self.on_subject_selected)
         
@@ -754,21 +1100,25 @@ class StudentAssistant(wx.Frame):
         grades_btn_sizer = wx.BoxSizer(wx.HORIZONTAL)
         add_grade_btn = wx.Button(grades_panel_lower, label="➕ Оценка")
         delete_grade_btn = wx.Button(grades_panel_lower, label="🗑️ Изтрий оценка")
+        all_grades_btn = wx.Button(grades_panel_lower, label="📋 Всички оценки")
         
         add_grade_btn.Bind(wx.EVT_BUTTON, self.add_grade)
         delete_grade_btn.Bind(wx.EVT_BUTTON, self.delete_grade)
+        all_grades_btn.Bind(wx.EVT_BUTTON, self.show_all_grades)
         
         grades_btn_sizer.Add(add_grade_btn, 0, wx.ALL, 5)
         grades_btn_sizer.Add(delete_grade_btn, 0, wx.ALL, 5)
+        grades_btn_sizer.Add(all_grades_btn, 0, wx.ALL, 5)
         
         # Списък с оценки
-        self.grades_list = wx.ListCtrl(grades_panel_lower, style=wx.LC_REPORT | wx.LC_SINGLE_SEL)
-        self.grades_list.AppendColumn("ID", width=50)
-        self.grades_list.AppendColumn("Оценка", width=80)
-        self.grades_list.AppendColumn("Макс", width=60)
-        self.grades_list.AppendColumn("Тип", width=100)
-        self.grades_list.AppendColumn("Описание", width=150)
-        self.grades_list.AppendColumn("Дата", width=100)
+        self.grades_list = VirtualListCtrl(
+            grades_panel_lower,
+            [("ID", 50), ("Предмет", 150), ("Оценка", 80), ("Макс", 60), ("Тип", 100),
+             ("Описание", 150), ("Дата", 100)],
+            lambda grade: (str(grade[0]), grade[2], f"{grade[4]:.1f}", f"{grade[5]:.1f}", grade[6],
+                           grade[7] or "", format_display_date(grade[8])),
+            worker=self.worker, key='grades_pages'
+        )
         
         # Средна оценка статистика
         self.gpa_label = wx.StaticText(grades_panel_lower, label="Средна оценка: 0.00")
@@ -787,29 +1137,34 @@ class StudentAssistant(wx.Frame):
         
         main_sizer.Add(splitter, 1, wx.EXPAND | wx.ALL, 5)
         grades_panel.SetSizer(main_sizer)
-        self.notebook.AddPage(grades_panel, "📊 Оценки")
+        
+        # Заредените агрегати по предмети - обновяват се точково при промени
+        self.subject_rows = []
+        self.grades_subject_id = None
+        self.grades_shown = False
+        
+        self.refresher.register('subjects', lambda details: self.grades.get_grade_summary(),
+                                self.show_subject_summary, covers=('subject_rows',))
+        self.refresher.register('subject_rows', self.load_subject_rows, self.show_subject_rows)
+        self.refresher.register('grades_list', self.load_grades_counts, self.show_grades_counts)
         
         # Зареждаме данните
         self.refresh_subjects()
-        self.update_average_display()
 
     # GRADES МЕТОДИ
     # --------------------------------------------------------------------------------
 
     def refresh_subjects(self, event=None):
-        """Обновява списъка с предмети"""
-        self.subjects_list.DeleteAllItems()
-        subjects = self.grades.get_all_subjects()
-        
-        for subject in subjects:
-            index = self.subjects_list.InsertItem(self.subjects_list.GetItemCount(), str(subject[0]))
-            self.subjects_list.SetItem(index, 1, subject[1])  # name
-            self.subjects_list.SetItem(index, 2, str(subject[2]))  # credits
-            self.subjects_list.SetItem(index, 3, subject[3] or "")  # professor
-            
-            # Изчисляваме средната оценка
-            avg = self.grades.calculate_subject_average(subject[0])
-            self.subjects_list.SetItem(index, 4, f"{avg:.2f}")
+        """Обновява списъка с предмети и общата средна оценка"""
+        # Една агрегатна заявка за всички предмети и средните им оценки
+        self.worker.submit(self.grades.get_grade_summary, key='subjects',
+                           callback=self.show_subject_summary)
+
+    def show_subject_summary(self, summary):
+        """Показва заредените предмети и средната оценка"""
+        self.subject_rows = summary['subjects']
+        self.subjects_list.set_rows(self.subject_rows)
+        self.update_average_display(summary)
 
     def add_subject(self, event):
         """Добавя нов предмет"""
@@ -817,9 +1172,7 @@ class StudentAssistant(wx.Frame):
         if dialog.ShowModal() == wx.ID_OK:
             name, credits, professor, semester = dialog.get_data()
             if name:
-                self.grades.add_subject(name, credits, professor, semester)
-                self.refresh_subjects()
-                self.update_average_display()
+                self.worker.submit(self.grades.add_subject, name, credits, professor, semester)
         dialog.Destroy()
 
     def delete_subject(self, event):
@@ -829,40 +1182,44 @@ class StudentAssistant(wx.Frame):
             wx.MessageBox("Моля изберете предмет за изтриване", "Информация")
             return
         
-        subject_id = int(self.subjects_list.GetItemText(selected, 0))
+        subject_id = self.subjects_list.get_row(selected)['id']
         
         if wx.MessageBox("Това ще изтрие и всички оценки за предмета!\nСигурни ли сте?", "Потвърждение", wx.YES_NO) == wx.YES:
-            self.grades.delete_subject(subject_id)
-            self.refresh_subjects()
-            self.refresh_grades()
-            self.update_average_display()
+            self.worker.submit(self.grades.delete_subject, subject_id)
 
     def on_subject_selected(self, event):
         """Показва оценките за избрания предмет"""
         selected = event.GetIndex()
-        subject_id = int(self.subjects_list.GetItemText(selected, 0))
+        subject_id = self.subjects_list.get_row(selected)['id']
+        # Повторното маркиране след точково обновяване не презарежда оценките
+        if self.grades_shown and subject_id == self.grades_subject_id:
+            return
         self.refresh_grades(subject_id)
 
     def refresh_grades(self, subject_id=None):
-        """Обновява списъка с оценки"""
-        self.grades_list.DeleteAllItems()
-        
-        if subject_id:
-            grades = self.grades.get_subject_grades(subject_id)
-        else:
-            # Показваме всички оценки
-            grades = []
-            subjects = self.grades.get_all_subjects()
-            for subject in subjects:
-                grades.extend(self.grades.get_subject_grades(subject[0]))
-        
-        for grade in grades:
-            index = self.grades_list.InsertItem(self.grades_list.GetItemCount(), str(grade[0]))
-            self.grades_list.SetItem(index, 1, f"{grade[2]:.1f}")  # grade
-            self.grades_list.SetItem(index, 2, f"{grade[3]:.1f}")  # max_grade
-            self.grades_list.SetItem(index, 3, grade[4])  # exam_type
-            self.grades_list.SetItem(index, 4, grade[5] or "")  # description
-            self.grades_list.SetItem(index, 5, grade[6])  # exam_date
+        """Обновява списъка с оценки (за предмет или всички)"""
+        self.grades_subject_id = subject_id
+        self.grades_shown = True
+        
+        def fetch(offset, limit, previous_row):
+            # Оценките идват заедно с името на предмета - една заявка на страница.
+            # Ако предишната страница е в кеша, продължаваме по (дата, id);
+            # OFFSET остава само за скок към произволно място.
+            if previous_row is not None:
+                after = (previous_row[8], previous_row[0])
+                return self.grades.get_grades_with_subjects(subject_id, limit=limit, after=after)
+            return self.grades.get_grades_with_subjects(subject_id, limit=limit, offset=offset)
+        
+        # Броят идва от фона; избор на друг предмет отменя предишната заявка
+        self.worker.submit(self.grades.count_grades_with_subjects, subject_id, key='grades_list',
+                           callback=lambda count: self.grades_list.set_source(count, fetch))
+
+    def show_all_grades(self, event):
+        """Показва оценките по всички предмети"""
+        selected = self.subjects_list.GetFirstSelected()
+        if selected != -1:
+            self.subjects_list.Select(selected, on=False)
+        self.refresh_grades(None)
 
     def add_grade(self, event):
         """Добавя нова оценка"""
@@ -872,16 +1229,13 @@ class StudentAssistant(wx.Frame):
             wx.MessageBox("Моля първо изберете предмет", "Информация")
             return
         
-        subject_id = int(self.subjects_list.GetItemText(selected, 0))
+        subject_id = self.subjects_list.get_row(selected)['id']
         
         dialog = GradeDialog(self, "Нова оценка")
         if dialog.ShowModal() == wx.ID_OK:
             grade, exam_type, description, exam_date = dialog.get_data()
             if grade is not None:
-                self.grades.add_grade(subject_id, grade, exam_type, description, exam_date)
-                self.refresh_grades(subject_id)
-                self.refresh_subjects()
-                self.update_average_display()
+                self.worker.submit(self.grades.add_grade, subject_id, grade, exam_type, description, exam_date)
         dialog.Destroy()
 
     def delete_grade(self, event):
@@ -891,24 +1245,394 @@ class StudentAssistant(wx.Frame):
             wx.MessageBox("Моля изберете оценка за изтриване", "Информация")
             return
         
-        grade_id = int(self.grades_list.GetItemText(selected, 0))
+        row = self.grades_list.get_row(selected)
+        if row is None:
+            return  # страницата още се зарежда
+        grade_id = row[0]
         
         if wx.MessageBox("Сигурни ли сте?", "Потвърждение", wx.YES_NO) == wx.YES:
-            self.grades.delete_grade(grade_id)
-            # Обновяваме текущите оценки
-            subject_selected = self.subjects_list.GetFirstSelected()
-            if subject_selected != -1:
-                subject_id = int(self.subjects_list.GetItemText(subject_selected, 0))
-                self.refresh_grades(subject_id)
-            self.refresh_subjects()
-            self.update_average_display()
-
-    def update_average_display(self):
+            self.worker.submit(self.grades.delete_grade, grade_id)
+
+    def on_subject_changed(self, change):
+        """Отбелязва реда на предмета за обновяване"""
+        if not hasattr(self, 'subjects_list'):
+            return
+        if change.operation == 'bulk_insert':
+            self.refresher.mark_dirty('subjects')
+            return
+        
+        self.refresher.mark_dirty('subject_rows', change.id)
+        if change.operation == 'delete' and self.grades_shown:
+            if self.grades_subject_id in (change.id, None):
+                self.refresher.mark_dirty('grades_list', self.grades_subject_id)
+
+    def on_grade_changed(self, change):
+        """Отбелязва засегнатия предмет и показаните оценки за обновяване"""
+        if not hasattr(self, 'subjects_list'):
+            return
+        if change.operation == 'bulk_insert':
+            self.refresher.mark_dirty('subjects')
+            if self.grades_shown:
+                self.refresher.mark_dirty('grades_list', self.grades_subject_id)
+            return
+        
+        # Агрегатите се смятат наново само за един предмет
+        self.refresher.mark_dirty('subject_rows', change.parent)
+        if self.grades_shown and self.grades_subject_id in (change.parent, None):
+            self.refresher.mark_dirty('grades_list', self.grades_subject_id)
+
+    def load_subject_rows(self, subject_ids):
+        """Зарежда агрегатите на променените предмети (във фонова нишка)"""
+        return {subject_id: self.grades.get_subject_summary(subject_id) for subject_id in subject_ids}
+
+    def show_subject_rows(self, subjects):
+        """Прилага заредените агрегати и преизчислява общата средна веднъж"""
+        for subject_id, subject in subjects.items():
+            self.patch_subject_row(subject_id, subject)
+        self.update_average_display(self.grades.summarize(self.subject_rows))
+
+    def load_grades_counts(self, subject_filters):
+        """Брои оценките за показаните филтри (във фонова нишка)"""
+        return {subject_id: self.grades.count_grades_with_subjects(subject_id) for subject_id in subject_filters}
+
+    def show_grades_counts(self, counts):
+        """Презарежда видимите страници на списъка с оценки"""
+        if not self.grades_shown or self.grades_subject_id not in counts:
+            return  # междувременно е избран друг предмет
+        self.grades_list.reload(counts[self.grades_subject_id])
+
+    def patch_subject_row(self, subject_id, subject):
+        """Заменя, вмъква или маха реда на предмета (None = изтрит)"""
+        rows = self.subject_rows
+        index = next((i for i, row in enumerate(rows) if row['id'] == subject_id), None)
+        
+        if index is not None and subject is not None:
+            rows[index] = subject
+            self.subjects_list.refresh_row(index)
+            return
+        
+        selected = self.subjects_list.GetFirstSelected()
+        selected_id = rows[selected]['id'] if selected != -1 else None
+        
+        if index is not None:
+            del rows[index]
+        if subject is not None:
+            # Списъкът е подреден по име, както в get_grade_summary()
+            position = next((i for i, row in enumerate(rows) if row['name'] > subject['name']), len(rows))
+            rows.insert(position, subject)
+        
+        select = next((i for i, row in enumerate(rows) if row['id'] == selected_id), None)
+        self.subjects_list.reload(len(rows), select=select)
+
+    def update_average_display(self, summary=None):
         """Обновява показаната средна оценка"""
-        average = self.grades.calculate_average_grade()
+        if summary is None:
+            self.worker.submit(self.grades.get_grade_summary, key='average',
+                               callback=self.update_average_display)
+            return
+        average = summary['average_grade']
         self.gpa_label.SetLabel(f"Средна оценка: {average:.2f}")
 
 
+# ============================================================================
+# 🔄 ОБНОВЯВАНЕ НА ИЗГЛЕДИТЕ - събира промените и ги показва наведнъж
+# ============================================================================
+
+class RefreshScheduler:
+    """Обединява обновяванията на изгледите след промени в данните
+    
+    Всяка област се регистрира с load(details), която чете данните във
+    фонова нишка, и show(data), която ги показва в GUI нишката. mark_dirty()
+    само отбелязва областта; след края на текущия обработчик (CallAfter)
+    всички отбелязани области се зареждат с една задача върху един и същ
+    снимок на базата и се показват между Freeze() и Thaw().
+    """
+    def __init__(self, window, worker, db):
+        self.window = window
+        self.worker = worker
+        self.db = db
+        self._regions = {}
+        self._dirty = {}
+        self._scheduled = False
+        # Пореден номер на обновяването - по-старо не бива да презапише по-ново
+        self._flush_seq = 0
+        self._shown_seq = {}
+    
+    def register(self, name, load, show, covers=()):
+        """Регистрира област; covers са области, които тя обновява косвено"""
+        self._regions[name] = (load, show, covers)
+    
+    def mark_dirty(self, name, detail=None):
+        """Отбелязва област за обновяване; detail се събира в множество за load"""
+        if name not in self._regions:
+            return  # табът още не е изграден
+        details = self._dirty.setdefault(name, set())
+        if detail is not None:
+            details.add(detail)
+        if not self._scheduled:
+            self._scheduled = True
+            wx.CallAfter(self.flush)
+    
+    def flush(self):
+        """Зарежда всички отбелязани области във фона и ги показва наведнъж"""
+        dirty, self._dirty = self._dirty, {}
+        self._scheduled = False
+        for name in list(dirty):
+            for covered in self._regions[name][2]:
+                dirty.pop(covered, None)
+        if not dirty:
+            return
+        
+        self._flush_seq += 1
+        seq = self._flush_seq
+        jobs = [(name, self._regions[name][0], details) for name, details in dirty.items()]
+        
+        def load_all():
+            with self.db.snapshot():
+                return [(name, load(details)) for name, load, details in jobs]
+        
+        self.worker.submit(load_all, callback=lambda results: self._show(seq, results))
+    
+    def _show(self, seq, results):
+        self.window.Freeze()
+        try:
+            for name, data in results:
+                if self._shown_seq.get(name, 0) > seq:
+                    continue
+                self._shown_seq[name] = seq
+                self._regions[name][1](data)
+        finally:
+            self.window.Thaw()
+
+
+# ============================================================================
+# 🧩 ВИРТУАЛНИ СПИСЪЦИ - показват само видимите редове
+# ============================================================================
+
+class RowCache:
+    """Кеш на страници с редове, зареждани при нужда
+    
+    fetch(offset, limit, previous_row) връща редовете на една страница;
+    previous_row е последният ред на предишната страница, ако е в кеша
+    (за странициране по ключ), иначе None. Пазят се най-много max_pages
+    страници - най-отдавна ползваните се изхвърлят. generation се сменя
+    при всяко изчистване, за да не се запишат страници със стари данни.
+    """
+    def __init__(self, fetch, page_size=100, max_pages=20):
+        self.fetch = fetch
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.generation = 0
+        self._pages = OrderedDict()
+    
+    def get(self, index):
+        """Връща реда с даден индекс, като зарежда страницата при нужда"""
+        page_index, offset = divmod(index, self.page_size)
+        page = self._pages.get(page_index)
+        
+        if page is None:
+            page = self.fetch_pages([page_index], {page_index: self.previous_row(page_index)})[page_index]
+            self.store({page_index: page})
+        else:
+            self._pages.move_to_end(page_index)
+        
+        return page[offset] if offset < len(page) else None
+    
+    def peek(self, index):
+        """Връща реда само ако страницата му е в кеша (иначе None)"""
+        page_index, offset = divmod(index, self.page_size)
+        page = self._pages.get(page_index)
+        if page is None:
+            return None
+        self._pages.move_to_end(page_index)
+        return page[offset] if offset < len(page) else None
+    
+    def has_page(self, page_index):
+        return page_index in self._pages
+    
+    def previous_row(self, page_index):
+        """Последният ред на предишната страница, ако е в кеша"""
+        previous = self._pages.get(page_index - 1)
+        return previous[-1] if previous else None
+    
+    def fetch_pages(self, pages, previous_rows):
+        """Чете страниците (може и във фонова нишка) и връща {индекс: редове}
+        
+        Поредните страници продължават по ключ от току-що прочетената.
+        """
+        loaded = {}
+        for page_index in sorted(pages):
+            previous = loaded.get(page_index - 1)
+            previous_row = previous[-1] if previous else previous_rows.get(page_index)
+            loaded[page_index] = self.fetch(page_index * self.page_size, self.page_size, previous_row)
+        return loaded
+    
+    def store(self, loaded):
+        """Записва прочетените страници в кеша"""
+        for page_index, rows in loaded.items():
+            self._pages[page_index] = rows
+            self._pages.move_to_end(page_index)
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+    
+    def clear(self):
+        self.generation += 1
+        self._pages.clear()
+    
+    def invalidate(self, index):
+        """Изхвърля страницата, в която е редът"""
+        self.generation += 1
+        self._pages.pop(index // self.page_size, None)
+
+
+class VirtualListCtrl(wx.ListCtrl):
+    """ListCtrl в LC_VIRTUAL режим, който чете редовете от RowCache
+    
+    Контролът не пази копие на данните - при показване иска текста на
+    клетката и кешът зарежда само страницата, в която попада редът.
+    Ако е даден worker, страниците се четат във фонова нишка (заявките
+    с един и същ key се заменят): докато дойдат, редът показва "…".
+    """
+    PLACEHOLDER = "…"
+    
+    def __init__(self, parent, columns, format_row, page_size=100, worker=None, key=None, **kwargs):
+        super().__init__(parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_SINGLE_SEL, **kwargs)
+        for label, width in columns:
+            self.AppendColumn(label, width=width)
+        
+        self.format_row = format_row
+        self.page_size = page_size
+        self.worker = worker
+        self.key = key
+        self._cache = None
+        self._async = False
+        # Страниците, поискани от OnGetItemText след последното зареждане
+        self._wanted = set()
+        self._load_scheduled = False
+    
+    def set_source(self, count, fetch, worker=True):
+        """Задава нов източник на данни и броя редове в него"""
+        def fetch_formatted(offset, limit, previous_entry):
+            # Пазим суровия ред заедно с текста на клетките, за да не форматираме наново
+            previous_row = previous_entry[0] if previous_entry else None
+            return [(row, self.format_row(row)) for row in fetch(offset, limit, previous_row)]
+        
+        self._cache = RowCache(fetch_formatted, self.page_size)
+        self._async = worker and self.worker is not None
+        self._wanted.clear()
+        # Изчистваме селекцията - индексите вече сочат други редове
+        self.DeleteAllItems()
+        self.SetItemCount(count)
+        self.Refresh()
+    
+    def set_rows(self, rows):
+        """Показва готов списък с редове (за малки, вече заредени данни)"""
+        # Данните са в паметта - няма смисъл да минават през фона
+        self.set_source(len(rows), lambda offset, limit, previous_row: rows[offset:offset + limit],
+                        worker=False)
+    
+    def reload(self, count, select=None):
+        """Презарежда редовете от същия източник при нов брой редове
+        
+        Зареждат се отново само видимите страници. Ако select е зададен,
+        маркира се този ред; иначе селекцията се маха, защото индексите
+        вече може да сочат други редове.
+        """
+        if self._cache is None:
+            return
+        self._cache.clear()
+        
+        selected = self.GetFirstSelected()
+        if selected != -1 and selected != select:
+            self.Select(selected, on=False)
+        self.SetItemCount(count)
+        if select is not None and 0 <= select < count and select != selected:
+            self.Select(select)
+            self.EnsureVisible(select)
+        self.Refresh()
+    
+    def refresh_row(self, index):
+        """Прерисува един ред, след като данните му са се променили"""
+        if self._cache is None:
+            return
+        self._cache.invalidate(index)
+        self.RefreshItem(index)
+    
+    def get_row(self, index):
+        """Връща суровите данни на реда (None, ако страницата още се зарежда)"""
+        entry = self._entry(index)
+        return entry[0] if entry else None
+    
+    def _entry(self, index):
+        if self._cache is None:
+            return None
+        if not self._async:
+            return self._cache.get(index)
+        
+        entry = self._cache.peek(index)
+        if entry is None:
+            self._request_page(index // self.page_size)
+        return entry
+    
+    def _request_page(self, page_index):
+        """Отбелязва страница за зареждане; заявката тръгва след текущото рисуване"""
+        if self._cache.has_page(page_index):
+            return
+        self._wanted.add(page_index)
+        self._schedule_load()
+    
+    def _schedule_load(self):
+        if not self._load_scheduled:
+            self._load_scheduled = True
+            wx.CallAfter(self._load_pages)
+    
+    def _load_pages(self):
+        """Зарежда във фона поисканите и видимите страници, които липсват"""
+        self._load_scheduled = False
+        wanted, self._wanted = self._wanted, set()
+        cache = self._cache
+        if cache is None or not self:
+            return
+        
+        # Видимите страници винаги влизат - новата заявка заменя предишната
+        top = self.GetTopItem()
+        bottom = min(top + self.GetCountPerPage(), self.GetItemCount() - 1)
+        if bottom >= top:
+            wanted.update(range(top // self.page_size, bottom // self.page_size + 1))
+        pages = [page for page in wanted if not cache.has_page(page)]
+        if not pages:
+            return
+        
+        generation = cache.generation
+        previous_rows = {page: cache.previous_row(page) for page in pages}
+        self.worker.submit(cache.fetch_pages, pages, previous_rows, key=self.key,
+                           callback=lambda loaded: self._show_pages(cache, generation, loaded))
+    
+    def _show_pages(self, cache, generation, loaded):
+        if not self or cache is not self._cache:
+            return
+        if cache.generation != generation:
+            # Данните са се сменили, докато страниците са се чели - искаме видимите наново
+            self._schedule_load()
+            return
+        
+        cache.store(loaded)
+        count = self.GetItemCount()
+        for page_index, rows in loaded.items():
+            first = page_index * self.page_size
+            last = min(first + len(rows), count) - 1
+            if last >= first:
+                self.RefreshItems(first, last)
+    
+    def OnGetItemText(self, item, column):
+        if self._cache is None:
+            return ""
+        entry = self._entry(item)
+        if entry is None:
+            return self.PLACEHOLDER if self._async else ""
+        return entry[1][column]
+
+
 # ============================================================================
 # 🪟 DIALOG КЛАСОВЕ - Диалогови прозорци
 # ============================================================================
@@ -1141,9 +1865,82 @@ class StudentApp(wx.App):
     def OnInit(self):
         frame = StudentAssistant()
         frame.Show()
+        self.frame = frame
         return True
 
 
+def collect_import_times(limit=40):
+    """Пуска `python -X importtime -c "import main"` и връща най-тежките импорти
+    
+    Времената на импортите в текущия процес вече са минали, затова ги
+    измерваме в отделен (студен) процес.
+    """
+    import subprocess
+    
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(parts[1]), int(parts[0]), parts[2].rstrip()))
+        except ValueError:
+            continue  # заглавният ред
+    
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def profile_startup(report_path):
+    """Профилира StudentApp.OnInit с cProfile и записва отчет заедно с импортите"""
+    import cProfile
+    import io
+    import pstats
+    
+    profiler = cProfile.Profile()
+    profiler.enable()
+    app = StudentApp()  # OnInit се изпълнява в конструктора
+    profiler.disable()
+    
+    stats_stream = io.StringIO()
+    pstats.Stats(profiler, stream=stats_stream).sort_stats("cumulative").print_stats(40)
+    
+    timings = app.frame.startup_timings
+    with open(report_path, "w", encoding="utf-8") as report:
+        report.write(f"Профил на стартирането - {datetime.now():%Y-%m-%d %H:%M:%S}\n")
+        report.write(f"Python {sys.version.split()[0]}, wxPython {wx.version()}\n\n")
+        report.write(f"Импорти в този процес: {timings['imports_ms']:.1f} ms\n")
+        report.write(f"Прозорец създаден: {timings['frame_ms']:.1f} ms\n\n")
+        
+        report.write("== -X importtime (кумулативно, μs) ==\n")
+        for cumulative, self_time, module in collect_import_times():
+            report.write(f"{cumulative:>10} {self_time:>10}  {module}\n")
+        
+        report.write("\n== cProfile на StudentApp.OnInit ==\n")
+        report.write(stats_stream.getvalue())
+    
+    print(f"📄 Профилът на стартирането е записан в {report_path}")
+    return app
+
+
 if __name__ == "__main__":
-    app = StudentApp()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Студентски асистент")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="профилира импортите и StudentApp.OnInit и записва отчет")
+    parser.add_argument("--profile-output", default="startup_profile.txt",
+                        help="файл за отчета от --profile-startup")
+    args = parser.parse_args()
+    
+    if args.profile_startup:
+        app = profile_startup(args.profile_output)
+    else:
+        app = StudentApp()
     app.MainLoop() 
\ No newline at end of file
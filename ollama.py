@@ -5,17 +5,218 @@ AI чат клиент за Ollama и OpenAI
 Базова функционалност за университетски проект
 """
 
-import requests
 import json
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENAI_URL = "https://api.openai.com/v1"
+
+
+class AIResponseError(Exception):
+    """Грешка при заявка към AI; текстът е готов за показване"""
+
+
+class AICancelled(AIResponseError):
+    """Генерирането е спряно от потребителя"""
+    def __init__(self, message="⏹️ Генерирането е спряно"):
+        super().__init__(message)
+
+
+class CancelToken:
+    """Позволява да се прекъсне текуща заявка от друга нишка
+    
+    cancel() затваря и отворения HTTP поток, така че четящата нишка не
+    чака следващото парче от модела.
+    """
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._response = None
+    
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+    
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            response = self._response
+        if response is not None:
+            response.close()
+    
+    def attach(self, response):
+        """Запомня потока на текущата заявка (None, когато приключи)"""
+        with self._lock:
+            self._response = response
+            cancelled = self._event.is_set()
+        if cancelled and response is not None:
+            response.close()
+
+
+class Conversation:
+    """История на един разговор с AI модела
+    
+    Пази репликите и преди всяка заявка проверява token_budget. При
+    превишаване най-старите реплики отпадат, докато историята слезе до
+    LOW_WATER от бюджета - така съкращаване (и обобщение) има веднъж на
+    няколко реплики, а началото на разговора остава същото между тях.
+    Ако е подаден summarizer(messages, cancel, max_chars) -> текст,
+    отпадналото се заменя с обобщение до SUMMARY_SHARE от бюджета.
+    """
+    # Груба оценка: около 4 символа на токен плюс няколко за ролята
+    CHARS_PER_TOKEN = 4
+    MESSAGE_OVERHEAD = 4
+    # До каква част от бюджета се съкращава и колко може да заеме обобщението
+    LOW_WATER = 0.6
+    SUMMARY_SHARE = 0.2
+    
+    def __init__(self, system_prompt=None, token_budget=3000, summarizer=None):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.messages = []
+        self.summary = None
+    
+    @classmethod
+    def estimate_tokens(cls, text):
+        """Оценява броя токени в текст"""
+        return len(text) // cls.CHARS_PER_TOKEN + 1
+    
+    def add(self, role, content):
+        self.messages.append({"role": role, "content": content})
+    
+    def discard_last(self):
+        """Маха последната реплика (напр. въпрос, на който не е отговорено)"""
+        if self.messages:
+            self.messages.pop()
+    
+    def build(self):
+        """Връща съобщенията за изпращане: системни указания, обобщение, история"""
+        prefix = []
+        if self.system_prompt:
+            prefix.append({"role": "system", "content": self.system_prompt})
+        if self.summary:
+            prefix.append({"role": "system", "content": self.SUMMARY_PREFIX + self.summary})
+        return prefix + self.messages
+    
+    SUMMARY_PREFIX = "Обобщение на досегашния разговор: "
+    
+    def _tokens(self, messages):
+        return sum(self.estimate_tokens(m["content"]) + self.MESSAGE_OVERHEAD for m in messages)
+    
+    def total_tokens(self):
+        """Оценка на токените, които ще се изпратят (с обобщението)"""
+        return self._tokens(self.build())
+    
+    def summary_chars(self):
+        """Най-голямата дължина на обобщението в символи"""
+        tokens = int(self.token_budget * self.SUMMARY_SHARE) - self.MESSAGE_OVERHEAD
+        return max(tokens, 0) * self.CHARS_PER_TOKEN - len(self.SUMMARY_PREFIX)
+    
+    def trim(self, cancel=None):
+        """Съкращава историята, ако е над бюджета; последната реплика винаги остава
+        
+        Обобщението се смята в бюджета: при summarizer за него се пази
+        SUMMARY_SHARE. Спиране през cancel (AICancelled) връща историята.
+        """
+        if self.total_tokens() <= self.token_budget:
+            return []
+        
+        target = int(self.token_budget * self.LOW_WATER)
+        system = [{"role": "system", "content": self.system_prompt}] if self.system_prompt else []
+        if self.summarizer is not None:
+            reserved = int(self.token_budget * self.SUMMARY_SHARE)
+        else:
+            reserved = self.total_tokens() - self._tokens(system + self.messages)
+        
+        dropped = []
+        while len(self.messages) > 1 and self._tokens(system + self.messages) + reserved > target:
+            dropped.append(self.messages.pop(0))
+        
+        if dropped and self.summarizer is not None:
+            # Старото обобщение влиза в новото, за да не се губи
+            previous = [{"role": "system", "content": self.summary}] if self.summary else []
+            limit = self.summary_chars()
+            try:
+                summary = self.summarizer(previous + dropped, cancel=cancel, max_chars=limit)
+            except AICancelled:
+                self.messages = dropped + self.messages
+                raise
+            except Exception as e:
+                print(f"⚠️ Неуспешно обобщение на разговора: {e}")
+            else:
+                self.summary = summary.strip()[:limit] or self.summary
+        return dropped
+    
+    def reset(self):
+        """Започва нов разговор"""
+        self.messages = []
+        self.summary = None
+
 
 class OllamaClient:
-    def __init__(self, base_url="http://localhost:11434"):
+    # Колко секунди се вярва на последното известно състояние на доставчика
+    HEALTH_TTL = 30
+    # Колко време Ollama да държи модела зареден след отговор
+    KEEP_ALIVE = "10m"
+    
+    def __init__(self, base_url="http://localhost:11434", cache=None):
         self.base_url = base_url
+        # ResponseCache (по избор) - повторените въпроси не стигат до модела
+        self.cache = cache
         self.current_model = None
         self.openai_api_key = None
         self.use_openai = False
+        
+        # Отделна сесия (пул от keep-alive връзки) за всеки доставчик
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        # Състояние на доставчиците: {доставчик: (достъпен, кога е видян)}.
+        # Обновява се от истинските заявки; активна проверка - само ако е неизвестно
+        self._health = {}
         print("🤖 AI клиент инициализиран")
     
+    @property
+    def provider(self):
+        return "openai" if self.use_openai else "ollama"
+    
+    def _session(self, provider):
+        """Връща сесията на доставчика (създава я при първа нужда)"""
+        with self._sessions_lock:
+            session = self._sessions.get(provider)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[provider] = session
+            return session
+    
+    def _mark_health(self, provider, available):
+        self._health[provider] = (available, time.monotonic())
+    
+    def _request(self, provider, method, url, **kwargs):
+        """Изпраща заявка през сесията на доставчика и отбелязва резултата"""
+        try:
+            response = self._session(provider).request(method, url, **kwargs)
+        except requests.exceptions.ConnectionError:
+            self._mark_health(provider, False)
+            raise
+        # Същото правило като при проверките: само успешен отговор значи "достъпен"
+        # (невалиден ключ или 5xx от прокси правят доставчика неизползваем)
+        self._mark_health(provider, response.ok)
+        return response
+    
+    def close(self):
+        """Затваря отворените връзки"""
+        with self._sessions_lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions = {}
+    
     def set_openai_key_and_mode(self, api_key):
         """Задава OpenAI API ключ и превключва в OpenAI режим"""
         self.openai_api_key = api_key
@@ -28,7 +229,15 @@ class OllamaClient:
         return True
     
     def check_connection(self):
-        """Проверява дали AI услугата работи"""
+        """Проверява дали AI услугата работи
+        
+        Използва резултата от последната истинска заявка; мрежова проверка
+        се прави само ако състоянието е неизвестно или по-старо от HEALTH_TTL.
+        """
+        state = self._health.get(self.provider)
+        if state is not None and time.monotonic() - state[1] < self.HEALTH_TTL:
+            return state[0]
+        
         if self.use_openai:
             return self._check_openai_connection()
         else:
@@ -37,8 +246,8 @@ class OllamaClient:
     def _check_ollama_connection(self):
         """Проверява дали Ollama работи"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=3)
-            return response.status_code == 200
+            response = self._request("ollama", "GET", f"{self.base_url}/api/tags", timeout=3)
+            return response.ok
         except requests.exceptions.RequestException:
             return False
     
@@ -48,9 +257,9 @@ class OllamaClient:
             return False
         try:
             headers = {"Authorization": f"Bearer {self.openai_api_key}"}
-            response = requests.get("https://api.openai.com/v1/models", 
-                                  headers=headers, timeout=5)
-            return response.status_code == 200
+            response = self._request("openai", "GET", f"{OPENAI_URL}/models",
+                                     headers=headers, timeout=5)
+            return response.ok
         except requests.exceptions.RequestException:
             return False
     
@@ -64,7 +273,7 @@ class OllamaClient:
     def _get_ollama_models(self):
         """Връща Ollama модели"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self._request("ollama", "GET", f"{self.base_url}/api/tags", timeout=5)
             if response.status_code == 200:
                 data = response.json()
                 return [model["name"] for model in data.get("models", [])]
@@ -76,51 +285,176 @@ class OllamaClient:
         """Задава модела за използване"""
         self.current_model = model_name
     
-    def chat(self, message):
-        """Изпраща съобщение към AI модела"""
+    def chat(self, message, conversation=None, use_cache=True):
+        """Изпраща съобщение към AI модела и връща целия отговор"""
+        chunks = self.chat_stream(message, conversation=conversation, use_cache=use_cache)
+        return "".join(chunks) or "Няма отговор"
+    
+    def chat_stream(self, message, on_token=None, conversation=None, use_cache=True, cancel=None):
+        """Изпраща съобщение и връща отговора на части, докато моделът пише
+        
+        Генератор на текстови парчета; ако е подаден on_token, той се
+        извиква и за всяко парче. Грешките идват като парче с "❌".
+        С conversation съобщението се изпраща заедно с историята, а
+        отговорът се добавя към нея. use_cache=False заобикаля кеша, а
+        CancelToken в cancel позволява генерирането да се спре.
+        """
+        if conversation is None:
+            messages = [{"role": "user", "content": message}]
+        else:
+            conversation.add("user", message)
+            messages = conversation.build()
+        
+        # Ключът е по цялата история - попадение в кеша не чака обобщение
+        cache_key = None
+        if use_cache and self.cache is not None and self.current_model:
+            cache_key = self.cache.make_key(self.provider, self.current_model, messages,
+                                            self._request_params())
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                if conversation is not None:
+                    conversation.add("assistant", cached)
+                if on_token is not None:
+                    on_token(cached)
+                yield cached
+                return
+        
+        if conversation is not None:
+            try:
+                if conversation.trim(cancel):
+                    messages = conversation.build()
+            except AICancelled as e:
+                conversation.discard_last()
+                if on_token is not None:
+                    on_token(str(e))
+                yield str(e)
+                return
+        
+        reply = []
+        try:
+            for chunk in self._stream(messages, cancel):
+                reply.append(chunk)
+                if on_token is not None:
+                    on_token(chunk)
+                yield chunk
+        except AIResponseError as e:
+            if conversation is not None:
+                if isinstance(e, AICancelled) and reply:
+                    # Прочетеното до спирането остава в историята
+                    conversation.add("assistant", "".join(reply))
+                else:
+                    # Въпросът без отговор не остава в историята
+                    conversation.discard_last()
+            if on_token is not None:
+                on_token(str(e))
+            yield str(e)
+            return
+        
+        text = "".join(reply)
+        if conversation is not None:
+            conversation.add("assistant", text)
+        if cache_key is not None and text:
+            self.cache.put(cache_key, self.provider, self.current_model, text)
+    
+    def _request_params(self):
+        """Параметрите на генерирането, които влияят на отговора"""
+        if self.use_openai:
+            return {"max_tokens": 1000, "temperature": 0.7}
+        return {}
+    
+    def summarize(self, messages, cancel=None, max_chars=None):
+        """Обобщава част от разговор в няколко изречения (за Conversation)"""
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        limit = f" в не повече от {max_chars} знака" if max_chars else ""
+        prompt = (f"Обобщи накратко{limit} следния разговор, като запазиш важните факти "
+                  "и въпроси:\n\n" + transcript)
+        return "".join(self._stream([{"role": "user", "content": prompt}], cancel))
+    
+    def _stream(self, messages, cancel=None):
+        """Избира доставчика; при грешка хвърля AIResponseError"""
         if not self.current_model:
-            return "❌ Няма избран модел. Моля изберете модел."
+            raise AIResponseError("❌ Няма избран модел. Моля изберете модел.")
+        if cancel is not None and cancel.cancelled:
+            raise AICancelled()
         
         if self.use_openai:
-            return self._chat_openai(message)
+            chunks = self._stream_openai(messages, cancel)
         else:
-            return self._chat_ollama(message)
-    
-    def _chat_ollama(self, message):
-        """Ollama чат функционалност"""
-        if not self._check_ollama_connection():
-            return "❌ Ollama не е достъпен. Моля стартирайте оllama"
+            chunks = self._stream_ollama(messages, cancel)
         
+        try:
+            for chunk in chunks:
+                if cancel is not None and cancel.cancelled:
+                    raise AICancelled()
+                yield chunk
+            # Затвореният поток може и просто да свърши - тогава отговорът е непълен
+            if cancel is not None and cancel.cancelled:
+                raise AICancelled()
+        except AIResponseError as e:
+            # Затвореният отвън поток изглежда като мрежова грешка
+            if cancel is not None and cancel.cancelled and not isinstance(e, AICancelled):
+                raise AICancelled() from e
+            raise
+        finally:
+            chunks.close()
+            if cancel is not None:
+                cancel.attach(None)
+    
+    def _stream_ollama(self, messages, cancel=None):
+        """Ollama чат функционалност (NDJSON поток от /api/chat)"""
+        # Без отделна проверка преди заявката - недостъпен сървър се вижда
+        # от грешката при свързване
         try:
             request_data = {
                 "model": self.current_model,
-                "prompt": message,
-                "stream": False
+                "messages": messages,
+                "stream": True,
+                # Моделът остава зареден между репликите и не обработва
+                # наново общото начало на разговора
+                "keep_alive": self.KEEP_ALIVE
             }
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
+            # Таймаутът за четене е между две парчета, не за целия отговор
+            with self._request(
+                "ollama", "POST",
+                f"{self.base_url}/api/chat",
                 json=request_data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data.get("response", "Няма отговор")
-            else:
-                return f"❌ Ollama грешка {response.status_code}"
+                stream=True,
+                timeout=(5, 30)
+            ) as response:
+                if cancel is not None:
+                    cancel.attach(response)
+                if response.status_code != 200:
+                    raise AIResponseError(f"❌ Ollama грешка {response.status_code}")
                 
+                # Всеки ред е отделен JSON обект
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    data = json.loads(line)
+                    if "error" in data:
+                        raise AIResponseError(f"❌ Ollama грешка: {data['error']}")
+                    content = data.get("message", {}).get("content")
+                    if content:
+                        yield content
+                    if data.get("done"):
+                        return
+                
+        except AIResponseError:
+            raise
+        except requests.exceptions.ConnectionError:
+            raise AIResponseError("❌ Ollama не е достъпен. Моля стартирайте оllama")
         except requests.exceptions.Timeout:
-            return "❌ Времето за отговор изтече (30 сек)"
+            raise AIResponseError("❌ Времето за отговор изтече (30 сек без нов текст)")
         except requests.exceptions.RequestException as e:
-            return f"❌ Ollama мрежова грешка: {str(e)}"
+            raise AIResponseError(f"❌ Ollama мрежова грешка: {str(e)}")
         except Exception as e:
-            return f"❌ Ollama неочаквана грешка: {str(e)}"
+            raise AIResponseError(f"❌ Ollama неочаквана грешка: {str(e)}")
     
-    def _chat_openai(self, message):
-        """OpenAI чат функционалност"""
+    def _stream_openai(self, messages, cancel=None):
+        """OpenAI чат функционалност (SSE поток от chat/completions)"""
         if not self.openai_api_key:
-            return "❌ Няма зададен OpenAI API ключ"
+            raise AIResponseError("❌ Няма зададен OpenAI API ключ")
         
         try:
             headers = {
@@ -130,30 +464,45 @@ class OllamaClient:
             
             request_data = {
                 "model": self.current_model,
-                "messages": [{"role": "user", "content": message}],
-                "max_tokens": 1000,
-                "temperature": 0.7
+                "messages": messages,
+                "stream": True,
+                **self._request_params()
             }
             
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
+            with self._request(
+                "openai", "POST",
+                f"{OPENAI_URL}/chat/completions",
                 headers=headers,
                 json=request_data,
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return data["choices"][0]["message"]["content"]
-            else:
-                return f"❌ OpenAI грешка {response.status_code}"
+                stream=True,
+                timeout=(5, 30)
+            ) as response:
+                if cancel is not None:
+                    cancel.attach(response)
+                if response.status_code != 200:
+                    raise AIResponseError(f"❌ OpenAI грешка {response.status_code}")
+                
+                # Server-Sent Events: редове "data: {...}", накрая "data: [DONE]"
+                for line in response.iter_lines():
+                    line = line.decode("utf-8")
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[5:].strip()
+                    if payload == "[DONE]":
+                        return
+                    choices = json.loads(payload).get("choices") or [{}]
+                    content = choices[0].get("delta", {}).get("content")
+                    if content:
+                        yield content
                 
+        except AIResponseError:
+            raise
         except requests.exceptions.Timeout:
-            return "❌ OpenAI: Времето за отговор изтече (30 сек)"
+            raise AIResponseError("❌ OpenAI: Времето за отговор изтече (30 сек без нов текст)")
         except requests.exceptions.RequestException as e:
-            return f"❌ OpenAI мрежова грешка: {str(e)}"
+            raise AIResponseError(f"❌ OpenAI мрежова грешка: {str(e)}")
         except Exception as e:
-            return f"❌ OpenAI неочаквана грешка: {str(e)}"
+            raise AIResponseError(f"❌ OpenAI неочаквана грешка: {str(e)}")
     
     def get_status(self):
         """Връща статуса на връзката"""
@@ -5,7 +5,6 @@ Pomodoro таймер
 Базова функционалност за продуктивност
 """
 
-import time
 import threading
 from datetime import datetime
 
@@ -20,8 +19,40 @@ class PomodoroTimer:
         self.remaining_seconds = 0
         self.sessions_completed = 0
         
+        # Абонати за събития: callback(event, status), където event е
+        # 'started', 'paused', 'resumed', 'tick', 'completed' или 'stopped'
+        self._listeners = []
+        # Събития на текущата сесия - всяка сесия има свои, за да не се
+        # бърка стара нишка с нова след бързо спиране и пускане
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        
         print("🍅 Pomodoro таймер готов!")
     
+    def add_listener(self, callback):
+        """Абонира callback(event, status) за промените в таймера
+        
+        Извиква се от нишката, в която е станала промяната ('tick' и
+        'completed' идват от нишката на таймера).
+        """
+        self._listeners.append(callback)
+    
+    def remove_listener(self, callback):
+        """Премахва абонамент"""
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+    
+    def _emit(self, event):
+        """Уведомява абонатите за събитие"""
+        if not self._listeners:
+            return
+        status = self.get_status()
+        for callback in list(self._listeners):
+            try:
+                callback(event, status)
+            except Exception as e:
+                print(f"⚠️ Грешка в Pomodoro абонат: {e}")
+    
     def start_session(self, session_type):
         """Общ метод за стартиране на сесия"""
         if self.is_running:
@@ -33,10 +64,14 @@ class PomodoroTimer:
         minutes = self.work_minutes if session_type == 'work' else self.break_minutes
         self.remaining_seconds = minutes * 60
         self.is_running = True
+        self._stop_event = threading.Event()
+        self._resume_event = threading.Event()
+        self._resume_event.set()
         
         session_name = "работна сесия" if session_type == 'work' else "почивка"
         print(f"{'🎯' if session_type == 'work' else '☕'} Започвам {session_name}: {minutes} минути")
         self._start_timer()
+        self._emit('started')
         return True
     
     def start_work_session(self):
@@ -50,14 +85,25 @@ class PomodoroTimer:
     def pause_timer(self):
         """Превключва пауза/продължи"""
         self.is_paused = not self.is_paused
+        if self.is_paused:
+            self._resume_event.clear()
+        else:
+            self._resume_event.set()
         print("⏸️ Пауза" if self.is_paused else "▶️ Продължавам")
+        
+        if self.is_running:
+            self._emit('paused' if self.is_paused else 'resumed')
     
     def stop_timer(self):
         """Спира таймера"""
         if self.is_running:
             self.is_running = False
             self.is_paused = False
+            # Събуждаме нишката, за да приключи веднага (и ако е в пауза)
+            self._stop_event.set()
+            self._resume_event.set()
             print("⏹️ Таймерът е спрян")
+            self._emit('stopped')
             return True
         else:
             print("⚠️ Таймерът не работи")
@@ -65,21 +111,28 @@ class PomodoroTimer:
     
     def _start_timer(self):
         """Вътрешен метод за стартиране на таймера"""
+        stop_event = self._stop_event
+        resume_event = self._resume_event
+        
         def timer_thread():
-            while self.is_running and self.remaining_seconds > 0:
-                if not self.is_paused:
-                    time.sleep(1)
-                    self.remaining_seconds -= 1
-                    
-                    # Показваме прогреса на всеки 5 минути
-                    if self.remaining_seconds % 300 == 0 and self.remaining_seconds > 0:
-                        minutes_left = self.remaining_seconds // 60
-                        print(f"⏰ Остават {minutes_left} минути...")
-                else:
-                    time.sleep(0.1)  # Проверяваме за unpause по-често
+            while not stop_event.is_set() and self.remaining_seconds > 0:
+                # В пауза нишката спи, докато не я събудят (без периодични проверки)
+                resume_event.wait()
+                if stop_event.wait(1) or stop_event.is_set():
+                    break
+                if self.is_paused:
+                    continue  # паузата е дошла по време на секундата
+                
+                self.remaining_seconds -= 1
+                self._emit('tick')
+                
+                # Показваме прогреса на всеки 5 минути
+                if self.remaining_seconds % 300 == 0 and self.remaining_seconds > 0:
+                    minutes_left = self.remaining_seconds // 60
+                    print(f"⏰ Остават {minutes_left} минути...")
             
             # Таймерът приключи
-            if self.is_running:
+            if not stop_event.is_set() and self.is_running:
                 self._session_completed()
         
         # Стартираме в отделен thread
@@ -100,6 +153,7 @@ class PomodoroTimer:
             print("💡 Препоръка: Започнете нова работна сесия")
         
         print("\a")  # Звуков сигнал
+        self._emit('completed')
         self.current_session = None
     
     def get_status(self):
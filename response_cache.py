@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кеш на отговорите от AI
+Повторените въпроси се връщат веднага, без заявка към модела
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+
+def normalize_prompt(text):
+    """Уеднаквява въпроса: малки букви и единични интервали"""
+    return " ".join(text.lower().split())
+
+
+class ResponseCache:
+    """Двустепенен кеш: LRU в паметта и таблица ai_cache в базата
+
+    Ключът е хеш от доставчика, модела, нормализираните съобщения и
+    параметрите на заявката. Записите са валидни ttl_hours часа; в паметта
+    се пазят до max_memory, а в базата - до max_rows най-скоро ползвани.
+    """
+    def __init__(self, db, ttl_hours=24 * 7, max_memory=200, max_rows=5000):
+        self.db = db
+        self.ttl = timedelta(hours=ttl_hours)
+        self.max_memory = max_memory
+        self.max_rows = max_rows
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider, model, messages, params=None):
+        """Връща ключа на заявка"""
+        normalized = [(m["role"], normalize_prompt(m["content"])) for m in messages]
+        payload = json.dumps([provider, model, normalized, params or {}],
+                             ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """Връща кеширания отговор или None"""
+        oldest = datetime.now() - self.ttl
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                response, created = entry
+                if created >= oldest:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._memory[key]
+
+        row = self.db.get_ai_response(key, oldest)
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            response, created = row
+            self._remember(key, response, created)
+        return response
+
+    def put(self, key, provider, model, response):
+        """Записва отговор в двете нива"""
+        with self._lock:
+            self._remember(key, response, datetime.now())
+        self.db.put_ai_response(key, provider, model, response)
+        self.db.evict_ai_responses(datetime.now() - self.ttl, self.max_rows)
+
+    def _remember(self, key, response, created):
+        self._memory[key] = (response, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        """Изчиства кеша и броячите"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = 0
+            self.misses = 0
+        self.db.clear_ai_responses()
+
+    def get_statistics(self):
+        """Връща броя попадения/пропуски и дела на попаденията"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'memory_entries': len(self._memory),
+            }
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Кеш на статистиките за началната страница
+Броячите се поддържат от известията за промени в базата
+"""
+
+import threading
+
+
+class StatisticsCache:
+    """Пази броячите и статистиките за оценките между заявките
+
+    Всяка стойност се смята с една заявка при първото поискване и после
+    се чете от паметта. Единичните добавяния/изтривания променят броячите
+    с ±1 без нова заявка; масовите вмъквания само изчистват засегнатите
+    стойности - те се смятат наново при нужда. За статистиките на оценките
+    се пазят агрегатите по предмети и след промяна се чете наново само
+    засегнатият предмет (както в списъка с предмети).
+    """
+    # Кой брояч се променя при промяна на даден тип запис
+    COUNTS = {
+        'note': 'notes_count',
+        'event': 'events_count',
+        'subject': 'subjects_count',
+        'grade': 'grades_count',
+    }
+
+    def __init__(self, db, grades):
+        self.db = db
+        self.grades = grades
+        self._loaders = {
+            'notes_count': db.get_notes_count,
+            'events_count': db.get_events_count,
+            'subjects_count': db.get_subjects_count,
+            'grades_count': db.get_grades_count,
+            'grade_stats': self._load_grade_stats,
+        }
+        self._values = {}
+        # Версията на ключ се сменя при всяка промяна, за да не запишем
+        # стойност, изчислена преди нея
+        self._versions = {}
+        # Агрегатите по предмети ({id: предмет}) и предметите, които да се презаредят
+        self._subjects = None
+        self._dirty_subjects = set()
+        self._subjects_version = 0
+        self._lock = threading.Lock()
+        db.subscribe(self.on_change)
+
+    def get(self, key):
+        """Връща стойността от кеша или я изчислява с една заявка"""
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+            version = self._versions.get(key, 0)
+
+        value = self._loaders[key]()
+        with self._lock:
+            if self._versions.get(key, 0) == version:
+                self._values[key] = value
+        return value
+
+    def get_dashboard(self):
+        """Връща всички статистики за началната страница"""
+        return {key: self.get(key) for key in self._loaders}
+
+    def peek_dashboard(self):
+        """Връща статистиките само ако всички са в кеша (иначе None)"""
+        with self._lock:
+            if all(key in self._values for key in self._loaders):
+                return dict(self._values)
+        return None
+
+    def invalidate(self, key=None):
+        """Изчиства една стойност (или всички)"""
+        with self._lock:
+            for name in ([key] if key is not None else list(self._loaders)):
+                self._forget(name)
+            if key in (None, 'grade_stats'):
+                self._subjects = None
+                self._dirty_subjects.clear()
+                self._subjects_version += 1
+
+    def on_change(self, change):
+        """Абонат на Database - обновява кеша след запис"""
+        key = self.COUNTS.get(change.entity)
+        if key is None:
+            return
+
+        with self._lock:
+            if change.operation == 'bulk_insert':
+                self._forget(key)
+            else:
+                delta = 1 if change.operation == 'insert' else -1
+                self._versions[key] = self._versions.get(key, 0) + 1
+                if key in self._values:
+                    self._values[key] += delta
+
+            if change.entity in ('subject', 'grade'):
+                self._forget('grade_stats')
+                self._subjects_version += 1
+                subject_id = change.id if change.entity == 'subject' else change.parent
+                if change.operation == 'bulk_insert' or subject_id is None:
+                    self._subjects = None
+                elif change.entity == 'subject' and change.operation == 'delete':
+                    # Оценките на предмета се изтриват заедно с него
+                    self._forget('grades_count')
+                    self._subjects = None
+                else:
+                    self._dirty_subjects.add(subject_id)
+            if self._subjects is None:
+                self._dirty_subjects.clear()
+
+    def _load_grade_stats(self):
+        """Статистиките на оценките - презарежда само променените предмети"""
+        with self._lock:
+            version = self._subjects_version
+            subjects = self._subjects
+            dirty = set(self._dirty_subjects)
+        
+        if subjects is None:
+            loaded = {subject['id']: subject for subject in self.grades.get_grade_summary()['subjects']}
+        else:
+            loaded = dict(subjects)
+            for subject_id in dirty:
+                subject = self.grades.get_subject_summary(subject_id)
+                if subject is None:
+                    loaded.pop(subject_id, None)
+                else:
+                    loaded[subject_id] = subject
+        
+        with self._lock:
+            # Ако междувременно е дошла промяна, следващото четене ще я приложи
+            if self._subjects_version == version:
+                self._subjects = loaded
+                self._dirty_subjects.clear()
+        return self.grades.get_statistics(list(loaded.values()))
+    
+    def _forget(self, key):
+        self._versions[key] = self._versions.get(key, 0) + 1
+        self._values.pop(key, None)
+
+    def close(self):
+        """Спира абонамента за промени"""
+        self.db.unsubscribe(self.on_change)